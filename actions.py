@@ -0,0 +1,13 @@
+from enum import IntEnum
+
+class Action(IntEnum):
+    '''The input actions the game responds to, independent of where they came from.'''
+
+    # Keyboard and mouse events are turned into these actions, so a script can drive the game the same way a player does.
+    MOVE_RIGHT = 1 # right arrow pressed
+    STOP_RIGHT = 2 # right arrow released
+    MOVE_LEFT = 3 # left arrow pressed
+    STOP_LEFT = 4 # left arrow released
+    FIRE = 5 # spacebar pressed
+    PLAY = 6 # Play button clicked while the game is inactive
+    QUIT = 7 # window closed or 'Q' pressed
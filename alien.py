@@ -1,19 +1,26 @@
-import pygame
-from pygame.sprite import Sprite
+from asset_cache import assets
+from compact_sprite import CompactSprite
 
-class Alien(Sprite):
+class Alien(CompactSprite):
     '''A class to represent a single alien in the fleet.'''
 
+    IMAGE = 'images/alien.bmp'
+
+    # Fixed attributes instead of a per-alien dictionary, which adds up in a big fleet. The fleet_ names belong to Fleet.
+    __slots__ = ('context', 'image', 'rect', 'x', 'fleet_column', 'fleet_row', 'fleet_slot')
+
     def __init__(self, ai_game):
         '''Initialize the alien and set its starting position.'''
         super().__init__()
-        self.screen = ai_game.screen
-        self.settings = ai_game.settings
+        self.context = ai_game.sprite_context # shared screen and settings
 
-        # Load the alien image and set its rect attribute.
-        self.image = pygame.image.load('images/alien.bmp')
+        # Get the shared alien image and set its rect attribute.
+        self.image = assets.load_image(self.IMAGE) # every alien shares one Surface, so respawns don't read the disk
         self.rect = self.image.get_rect()
+        self.reset(ai_game)
 
+    def reset(self, ai_game):
+        '''Put the alien back at its starting position so a pooled alien can be used again.'''
         # Start each new alien near the top left of the screen.
         self.rect.x = self.rect.width # add a space to the left that is equal to the alien's width so it is easy to see
         self.rect.y = self.rect.height # add a space above it that is equal to the alien's height so it is easy to see
@@ -23,13 +30,14 @@ class Alien(Sprite):
 
     def check_edges(self):
         '''Return True if alien is at edge of screen.'''
-        screen_rect = self.screen.get_rect()
+        screen_rect = self.context.screen_rect
         if self.rect.right >= screen_rect.right or self.rect.left <= 0: # to see whether alien is at the left or right edge
             return True
 
-    def update(self):
-        '''Move the alien right or left.'''
-        self.x += self.settings.alien_speed * self.settings.fleet_direction
-        '''If fleet_direction is 1, the value of alien_speed will be added to the alien's current position, moving the alien to the
-        right; if fleet_direction is -1, the value will be subtracted from the alien's position, moving the alient to the left.'''
+    def update(self, dt):
+        '''Move the alien right or left; dt is the length of the step in seconds.'''
+        settings = self.context.settings
+        self.x += settings.alien_speed * settings.fleet_direction * dt
+        '''If fleet_direction is 1, the distance covered in dt will be added to the alien's current position, moving the alien to the
+        right; if fleet_direction is -1, it will be subtracted from the alien's position, moving the alient to the left.'''
         self.rect.x = self.x # update the position of the alien's rect
\ No newline at end of file
@@ -0,0 +1,179 @@
+'''A step/reset environment around the Alien Invasion game logic, plus a batch runner that spreads many independent
+episodes across a process pool. Useful for balancing Settings values and for training bots.
+
+    python alien_env.py --episodes 64 --processes 8 --set speedup_scale=1.2 --set bullets_allowed=5'''
+
+import argparse
+import os
+import random
+from multiprocessing import Pool
+from time import perf_counter
+
+from alien_invasion import AlienInvasion
+from actions import Action
+from settings import Settings
+from headless import parse_override
+
+# The discrete actions a policy can choose from: (move, fire).
+ACTIONS = (
+    (0, False), # do nothing
+    (-1, False), # move left
+    (1, False), # move right
+    (0, True), # fire
+    (-1, True), # move left and fire
+    (1, True), # move right and fire
+)
+
+# What each position in an observation means. Positions are fractions of the screen size.
+OBSERVATION_FIELDS = ('ship_x', 'fleet_left', 'fleet_right', 'fleet_bottom', 'fleet_direction',
+                      'aliens', 'bullets', 'level', 'ships_left')
+
+class AlienInvasionEnv:
+    '''A class that lets a program play Alien Invasion one step at a time.'''
+
+    def __init__(self, overrides=None, screen_size=(1200, 800), frame_skip=4, max_ticks=36000, ship_penalty=500):
+        '''Build a headless game; overrides maps setting names to values.'''
+        self.overrides = dict(overrides or {})
+        settings = Settings()
+        for name, value in self.overrides.items():
+            setattr(settings, name, value)
+        self.ai_game = AlienInvasion(headless=True, screen_size=screen_size, settings=settings)
+        self.frame_skip = frame_skip # game ticks simulated per step
+        self.max_ticks = max_ticks # episodes are cut off after this many ticks
+        self.ship_penalty = ship_penalty # reward lost for every ship the player loses
+        self.move = 0
+        self.seed = None
+        self.rng = random.Random()
+
+    def reset(self, seed=None):
+        '''Start a new episode and return the first observation.'''
+        ai_game = self.ai_game
+        self.seed = seed
+        self.rng = random.Random(seed) # the game itself has no randomness; policies draw from this
+        ai_game.stats.game_active = False
+        ai_game.stats.high_score = 0
+        ai_game._perform(Action.STOP_LEFT)
+        ai_game._perform(Action.STOP_RIGHT)
+        ai_game._perform(Action.PLAY) # resets the dynamic settings, so the overrides are applied again below
+        for name, value in self.overrides.items():
+            setattr(ai_game.settings, name, value)
+        self.start_tick = ai_game.tick
+        self.move = 0
+        return self.observation()
+
+    def step(self, action):
+        '''Apply one of ACTIONS (by index) and simulate frame_skip ticks; return (observation, reward, done, info).'''
+        ai_game = self.ai_game
+        move, fire = ACTIONS[action]
+        self._set_move(move)
+        if fire:
+            ai_game._perform(Action.FIRE)
+
+        score = ai_game.stats.score
+        ships_left = ai_game.stats.ships_left
+        dt = ai_game.clock.dt
+        for _ in range(self.frame_skip):
+            if not ai_game.stats.game_active:
+                break
+            ai_game._step(dt)
+
+        ticks = ai_game.tick - self.start_tick
+        reward = ai_game.stats.score - score - self.ship_penalty * (ships_left - ai_game.stats.ships_left)
+        game_over = not ai_game.stats.game_active
+        truncated = ticks >= self.max_ticks
+        info = {'score': ai_game.stats.score, 'level': ai_game.stats.level, 'ticks': ticks, 'truncated': truncated}
+        return self.observation(), reward, game_over or truncated, info
+
+    def _set_move(self, move):
+        '''Press and release the arrow keys so the ship moves in direction move (-1, 0 or 1).'''
+        if move == self.move:
+            return
+        perform = self.ai_game._perform
+        perform(Action.MOVE_LEFT if move < 0 else Action.STOP_LEFT)
+        perform(Action.MOVE_RIGHT if move > 0 else Action.STOP_RIGHT)
+        self.move = move
+
+    def observation(self):
+        '''Return the current state as a tuple of numbers in the order of OBSERVATION_FIELDS.'''
+        ai_game = self.ai_game
+        width = ai_game.settings.screen_width
+        height = ai_game.settings.screen_height
+        bounds = ai_game.aliens.bounds()
+        if bounds is not None:
+            fleet_left, fleet_right, fleet_bottom = bounds.left / width, bounds.right / width, bounds.bottom / height
+        else:
+            fleet_left = fleet_right = fleet_bottom = 0.0
+        return (ai_game.ship.rect.centerx / width, fleet_left, fleet_right, fleet_bottom, ai_game.settings.fleet_direction,
+                len(ai_game.aliens), len(ai_game.bullets), ai_game.stats.level, ai_game.stats.ships_left)
+
+def random_policy(observation, rng):
+    '''Pick any action at random.'''
+    return rng.randrange(len(ACTIONS))
+
+def tracking_policy(observation, rng):
+    '''Stay under the middle of the fleet and keep firing.'''
+    ship_x, fleet_left, fleet_right = observation[:3]
+    target = (fleet_left + fleet_right) / 2
+    if ship_x < target - 0.02:
+        return 5 # move right and fire
+    if ship_x > target + 0.02:
+        return 4 # move left and fire
+    return 3 # fire
+
+POLICIES = {'random': random_policy, 'tracking': tracking_policy}
+
+# Each worker process builds one environment and reuses it for every episode it is given.
+_worker_env = None
+
+def _init_worker(env_kwargs):
+    '''Create the worker's environment.'''
+    global _worker_env
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    os.environ['SDL_NO_SIGNAL_HANDLERS'] = '1' # otherwise SDL swallows the SIGTERM the pool uses to stop workers
+    _worker_env = AlienInvasionEnv(**env_kwargs)
+
+def _run_episode(job):
+    '''Play one episode in this worker and return its result.'''
+    seed, policy = job
+    env = _worker_env
+    observation = env.reset(seed)
+    total_reward = 0
+    done = False
+    info = {}
+    while not done:
+        observation, reward, done, info = env.step(policy(observation, env.rng))
+        total_reward += reward
+    return {'seed': seed, 'total_reward': total_reward, 'score': info['score'], 'level': info['level'],
+            'ticks': info['ticks'], 'truncated': info['truncated']}
+
+def run_batch(episodes, policy, processes=None, base_seed=0, **env_kwargs):
+    '''Run episodes independent episodes across a process pool and return their results in seed order.'''
+    jobs = [(base_seed + number, policy) for number in range(episodes)]
+    chunksize = max(1, episodes // (4 * (processes or os.cpu_count() or 1)))
+    with Pool(processes, initializer=_init_worker, initargs=(env_kwargs,)) as pool:
+        results = pool.map(_run_episode, jobs, chunksize=chunksize)
+        pool.close() # let the workers finish on their own before the pool is torn down
+        pool.join()
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run a batch of Alien Invasion episodes across processes.')
+    parser.add_argument('--episodes', type=int, default=32)
+    parser.add_argument('--processes', type=int, default=None, help='worker processes (default: one per core)')
+    parser.add_argument('--policy', choices=sorted(POLICIES), default='tracking')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first episode; the rest count up from it')
+    parser.add_argument('--max-ticks', type=int, default=36000, help='cut episodes off after this many ticks')
+    parser.add_argument('--set', dest='overrides', action='append', type=parse_override, default=[],
+                        help='override a setting, e.g. --set speedup_scale=1.2')
+    args = parser.parse_args()
+
+    start = perf_counter()
+    results = run_batch(args.episodes, POLICIES[args.policy], args.processes, args.seed,
+                        overrides=dict(args.overrides), max_ticks=args.max_ticks)
+    elapsed = perf_counter() - start
+
+    total_ticks = sum(result['ticks'] for result in results)
+    scores = [result['score'] for result in results]
+    print("{} episodes, {:,} ticks in {:.2f}s ({:,.0f} ticks/sec)".format(len(results), total_ticks, elapsed, total_ticks / elapsed))
+    print("score mean {:,.0f}, min {:,}, max {:,}; mean level {:.2f}".format(
+        sum(scores) / len(scores), min(scores), max(scores), sum(result['level'] for result in results) / len(results)))
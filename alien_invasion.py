@@ -1,5 +1,8 @@
+import os # lets us pick the SDL video driver before pygame starts
+import struct # packs the game state into bytes for hashing
 import sys # use tools in this module to exit the game when the player quits
-from time import sleep # allows us to pause the game for a moment when the ship is hit
+from time import perf_counter # a precise timer for the profiler
+from zlib import crc32 # a fast hash of the game state
 
 import pygame # contains the functionality we need to make a game
 
@@ -10,16 +13,53 @@ from button import Button
 from ship import Ship
 from bullet import Bullet
 from alien import Alien
+from fleet import Fleet, NumpyFleet
+from dirty_renderer import DirtyRenderer
+from game_clock import GameClock
+from sprite_pool import SpritePool, PooledGroup
+from frame_profiler import FrameProfiler
+from input_recorder import InputRecorder
+from frame_capture import FrameCapture
+from game_state import GameState
+from actions import Action
+from asset_cache import assets
+from compact_sprite import SpriteContext
+from pipeline import Pipeline
+from rival import Rival
 
 class AlienInvasion:
     '''Overall class to manage game assets and behavior.'''
 
-    def __init__(self):
-        '''Initialize the game, and create game resources.'''
-        pygame.init() # initializes the background settings that pygame needs to work properly
-        self.settings = Settings() # create an instance of Settings
-
-        self.screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN) # figure out a window size that will fill the screen
+    # How the fleet is laid out on each screen size we've seen, shared by every game in the process:
+    # (screen width, screen height) -> (aliens per row, rows).
+    _fleet_layouts = {}
+
+    # The only events the game responds to; every other kind is blocked, so it never reaches the event queue.
+    HANDLED_EVENTS = (pygame.QUIT, pygame.KEYDOWN, pygame.KEYUP, pygame.MOUSEBUTTONDOWN, pygame.WINDOWEXPOSED)
+    # Inputs whose input-to-display latency the profiler measures.
+    TIMED_INPUTS = (Action.MOVE_RIGHT, Action.MOVE_LEFT, Action.FIRE)
+
+    def __init__(self, headless=False, screen_size=None, settings=None):
+        '''Initialize the game, and create game resources; settings lets a caller pass in an already tweaked Settings.'''
+        if headless: # a headless game has no real window and is driven by scripted input
+            os.environ.setdefault('SDL_VIDEODRIVER', 'dummy') # SDL's dummy driver draws to memory instead of a window
+
+        # Time each stage of starting up, so a slow start shows where the time went.
+        self.startup_times = {} # stage name -> seconds
+        stage_start = perf_counter()
+
+        # Initialize only the parts of pygame the game uses; pygame.init() would also start audio and joysticks, which are slow.
+        pygame.display.init()
+        pygame.font.init()
+        self.settings = settings if settings is not None else Settings() # create an instance of Settings
+        stage_start = self._time_stage('init', stage_start)
+
+        if screen_size is None and headless:
+            screen_size = (self.settings.screen_width, self.settings.screen_height) # there is no monitor to fill
+        if screen_size is None:
+            self.screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN) # figure out a window size that will fill the screen
+        else:
+            self.screen = pygame.display.set_mode(screen_size) # use the requested size, e.g. for a headless run
         self.settings.screen_width = self.screen.get_rect().width # use width and height attributes to update the settings object
         self.settings.screen_height = self.screen.get_rect().height 
         # creates a display window on which we'll draw all the game's graphical elements
@@ -31,19 +71,30 @@ class AlienInvasion:
         display.set_mode() represents the entire game window. When we activate the game's animation loop, this surface will be
         redrawn on every pass through the loop, so it can be updated with any changes triggered by user input.'''
         pygame.display.set_caption("Alien Invasion")
+        self.sprite_context = SpriteContext(self.screen, self.settings) # what every sprite needs from the game, in one place
+        stage_start = self._time_stage('display', stage_start)
 
         # Create an instance to store game statistics and create a scoreboard.
         self.stats = GameStats(self)
+        self.state = GameState() # playing, a timed pause, or game over
         self.sb = Scoreboard(self)
+        stage_start = self._time_stage('scoreboard', stage_start) # loads the shared font and renders the digits
 
         self.ship = Ship(self) # make an instance of ship after the screen has been created
         # the call to Ship() requires one argument, an instance of AI and the self argument refers to the current instance of AI
         # this is the parameter that gives Ship access to the game's resources
-        self.bullets = pygame.sprite.Group() # instance of the pygame.sprite.Group class which behaves like a list
+        stage_start = self._time_stage('ship', stage_start)
+        # Pools hold on to dead bullets and aliens so new ones can be recycled instead of allocated.
+        self.bullet_pool = SpritePool(Bullet, enabled=self.settings.sprite_pools)
+        self.alien_pool = SpritePool(Alien, enabled=self.settings.sprite_pools)
+
+        self.bullets = PooledGroup(self.bullet_pool) # a pygame.sprite.Group that behaves like a list and recycles removed bullets
         # we will use this group to draw bullets to the screen on each pass through the main loop and to update each bullet's position
-        self.aliens = pygame.sprite.Group() # create a group to hold the fleet of aliens
+        self.aliens = self._make_fleet() # create a group to hold the fleet of aliens
+        self.rival = Rival(self) if self.settings.two_player else None # the second player's ship, bullets and score
 
         self.__create_fleet()
+        stage_start = self._time_stage('fleet', stage_start)
 
         # set the background color
         self.bg_color = (230, 230, 230) # colors in Pygame are specified as RGB colors (red, green, blue) that range from 0-255
@@ -51,19 +102,134 @@ class AlienInvasion:
 
         # Make the Play button.
         self.play_button = Button(self, "Play") # creates an instance of Button with the label "Play"
+        stage_start = self._time_stage('button', stage_start)
+
+        # The clock runs the game logic in fixed steps and keeps the frame rate in check.
+        self.clock = GameClock(self.settings)
+        self.profiler = FrameProfiler(self.settings) # times each phase of a frame when it is turned on
+
+        # Count simulation steps so input can be recorded against them and replayed exactly.
+        self.tick = 0
+        self.recorder = None
+        if self.settings.record_path:
+            self.recorder = InputRecorder(self.settings.record_path, self.screen.get_size(), self.settings)
+        self.capture = None
+        if self.settings.capture_path:
+            self.capture = FrameCapture(self.screen, self.settings) # writes every presented frame on its own thread
+
+        # Optionally repaint only the parts of the screen that changed.
+        self.dirty_renderer = DirtyRenderer(self) if self.settings.render_mode == 'dirty' else None
+        self.pipeline = None # set while the game runs with the simulation on its own thread
+        self.lockstep = None # set while the game runs in step with another game over the network
+
+        # Keep mouse motion, window and other unused events out of the queue, so key presses don't wait behind them.
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed(self.HANDLED_EVENTS)
+        self._time_stage('systems', stage_start)
+
+    def _time_stage(self, name, start):
+        '''Record how long the startup stage that began at start took, and return the time the next stage begins.'''
+        now = perf_counter()
+        self.startup_times[name] = now - start
+        return now
 
     def run_game(self): # game is controlled by the run_game() method
         '''Start the main loop for the game.'''
-        while True: # runs continually
-            # helper methods: do work inside a class but are not meant to be called through an instance
-            self._check_events() # allows you to manage events separately from other aspects of the game (always need to call)
+        if self.settings.pipelined:
+            self.pipeline = Pipeline(self)
+            self.pipeline.run() # the simulation gets its own thread and this one only draws; exits like the loop below
+            return
 
-            if self.stats.game_active: # only called when the game is active
-                self.ship.update() # allows position to be updated in response to player's input and ensures updated position will be used
-                self._update_bullets()
-                self._update_aliens()
+        # Put the first frame up straight away; it counts as the last stage of starting up.
+        stage_start = perf_counter()
+        self._update_screen()
+        self._time_stage('first_frame', stage_start)
 
-            self._update_screen() # a separate method to simplify code (always need to call)
+        while True: # runs continually
+            # Checking one flag per frame is all the profiler costs when it's off.
+            self._run_frame(self.profiler if self.profiler.enabled else None)
+
+    def _run_frame(self, profiler=None):
+        '''Run one pass of the main loop; when profiler is given, the time each phase takes goes to it.'''
+        # helper methods: do work inside a class but are not meant to be called through an instance
+        start = perf_counter()
+        self._check_events() # allows you to manage events separately from other aspects of the game (always need to call)
+        if profiler is not None:
+            profiler.add('check_events', perf_counter() - start)
+
+        # The clock sleeps until the next frame is due and tells us how many fixed steps of game time have passed.
+        # The time spent sleeping isn't part of any phase.
+        steps = self.clock.tick(self.stats.game_active)
+        for _ in range(steps):
+            if not self.stats.game_active: # only called when the game is active
+                break
+            self._step(self.clock.dt, profiler)
+
+        start = perf_counter()
+        self._update_screen() # a separate method to simplify code (always need to call)
+        if profiler is not None:
+            profiler.add('update_screen', perf_counter() - start)
+            profiler.end_frame()
+
+    def _step(self, dt, profiler=None):
+        '''Advance the game logic by one fixed step of dt seconds; when profiler is given, each phase is timed.'''
+        if self.state.paused: # nothing moves during a pause, but the pause itself runs on game time
+            self._advance_pause(dt)
+            self._end_step()
+            return
+
+        if profiler is None:
+            for update in self.STEP_PHASES.values():
+                update(self, dt)
+        else: # the same phases in the same order, each timed
+            for phase, update in self.STEP_PHASES.items():
+                start = perf_counter()
+                update(self, dt)
+                profiler.add(phase, perf_counter() - start)
+        self._end_step()
+
+    def _update_ships(self, dt):
+        '''Move the ships in response to the players' input.'''
+        ship_x = self.ship.rect.x
+        self.ship.update(dt) # allows position to be updated in response to player's input and ensures updated position will be used
+        if self.profiler.enabled and self.ship.rect.x != ship_x: # a waiting move input has now had an effect
+            self.profiler.input_took_effect(Action.MOVE_RIGHT if self.ship.rect.x > ship_x else Action.MOVE_LEFT)
+        if self.rival is not None:
+            self.rival.ship.update(dt)
+
+    def _advance_pause(self, dt):
+        '''Count down the current pause and carry on playing when it runs out.'''
+        if not self.state.advance(dt):
+            return
+        if self.state.current == GameState.RESPAWN_PAUSE:
+            # Get rid of any remaining aliens and bullets.
+            self.aliens.empty()
+            self.bullets.empty() # empty the groups aliens and bullets
+
+            # Create a new fleet and center the ship.
+            self.__create_fleet()
+            self.ship.center_ship()
+            if self.rival is not None:
+                self.rival.reset()
+        else: # the level transition is over, so bring in the next fleet
+            self.__create_fleet() # fills the screen with aliens again
+        self.state.enter(GameState.PLAYING)
+
+    def _end_step(self):
+        '''Count the step and, when recording, save a state hash every so often.'''
+        self.tick += 1
+        if self.recorder is not None and self.tick % self.settings.replay_hash_interval == 0:
+            self.recorder.record_state(self.tick, self.state_hash())
+
+    def state_hash(self):
+        '''Return a hash of the score, level, ships left, ship position and fleet positions (and the second player's
+        score, ship position and bullet counts in a two-player game).'''
+        values = [self.stats.score, self.stats.level, self.stats.ships_left, self.ship.rect.x]
+        if self.rival is not None:
+            values += [self.stats.rival_score, self.rival.ship.rect.x, len(self.bullets), len(self.rival.bullets)]
+        for alien in self.aliens.sprites():
+            values += alien.rect.topleft
+        return crc32(struct.pack('<{}q'.format(len(values)), *values))
 
     def _check_events(self):
         # Watch for keyboard and mouse events.
@@ -75,7 +241,7 @@ class AlienInvasion:
             that have taken place since the last time the function was called. Any keyboard or mouse event will cause this
             for loop to run.'''
             if event.type == pygame.QUIT: # to detect and respond to specific events like clicking the game window's close button
-                sys.exit() # exits the game
+                self._perform(Action.QUIT) # exits the game
             elif event.type == pygame.KEYDOWN: # KEYDOWN event = any key press by the user
                 self.__check_keydown_events(event) # call to new method (simpler with cleaner code structure)
             elif event.type == pygame.KEYUP:
@@ -83,18 +249,28 @@ class AlienInvasion:
             elif event.type == pygame.MOUSEBUTTONDOWN: # MOUSEBUTTONDOWN event = player clicks anywhere on the screen
                 mouse_pos = pygame.mouse.get_pos() # returns tuple containing the mouse cursor's x & y coordinates when mouse clicked
                 self._check_play_button(mouse_pos)
+            elif event.type == pygame.WINDOWEXPOSED: # the window was uncovered, and what was under it may be gone
+                if self.dirty_renderer is not None: # the other render modes repaint everything every frame anyway
+                    self.dirty_renderer.request_full_redraw()
 
     def _check_play_button(self, mouse_pos):
         '''Start a new game when the player clicks Play.'''
         button_clicked = self.play_button.rect.collidepoint(mouse_pos) # flag that stores a True or False value 
         if button_clicked and not self.stats.game_active: # will restart only if Play is clicked AND the game is not currently active
+            self._perform(Action.PLAY)
+
+    def _start_game(self):
+        '''Reset the game and start playing.'''
+        if not self.stats.game_active:
             # Reset the game statistics.
             self.settings.initialize_dynamic_settings() # return any changes settings to their initial values each new game
             self.stats.reset_stats() # reset the game statistics, which gives the player 3 new ships
             self.stats.game_active = True # game_active is True -> game begins!
+            self.state.enter(GameState.PLAYING)
             self.sb.prep_score() # call after resetting the game stats when starting a new game (preps scoreboard with a 0 score)
             self.sb.prep_level() # to ensure the level image updates properly at the start of a new game
             self.sb.prep_ships() # shows the player how many ships they have to start with
+            self.sb.prep_rival_score()
 
             # Get rid of any remaining aliens and bullets.
             self.aliens.empty() # empty groups
@@ -103,45 +279,112 @@ class AlienInvasion:
             # Create a new fleet and center the ship.
             self.__create_fleet()
             self.ship.center_ship()
+            if self.rival is not None:
+                self.rival.reset()
 
             # Hide the mouse cursor.
-            pygame.mouse.set_visible(False) # tells pygame to hide the cursor when the mouse is over the game window
+            if self.pipeline is None: # in pipelined mode the main thread does this when it sees the game start
+                pygame.mouse.set_visible(False) # tells pygame to hide the cursor when the mouse is over the game window
 
     def __check_keydown_events(self, event):
         '''Respond to keypresses.'''
         if event.key == pygame.K_RIGHT: # check whether the key pressed was the right arrow key
-            self.ship.moving_right = True # set moving_right to true when the right key is pressed
+            self._perform(Action.MOVE_RIGHT)
         elif event.key == pygame.K_LEFT:
-            self.ship.moving_left = True # set moving_left to true when the left key is pressed
+            self._perform(Action.MOVE_LEFT)
         elif event.key == pygame.K_q:
-            sys.exit() # ends the game when the player presses 'Q'
+            self._perform(Action.QUIT) # ends the game when the player presses 'Q'
         elif event.key == pygame.K_SPACE:
-            self._fire_bullet() # call _fire_bullet() when the spacebar is pressed
+            self._perform(Action.FIRE)
+        elif event.key == pygame.K_F3:
+            self.profiler.toggle_overlay() # show or hide the frame profiler
 
     def __check_keyup_events(self, event):
         '''Respond to key releases.'''
         if event.key == pygame.K_RIGHT:
-            self.ship.moving_right = False # set moving_right to false when right key is released
+            self._perform(Action.STOP_RIGHT)
         elif event.key == pygame.K_LEFT:
+            self._perform(Action.STOP_LEFT)
+
+    def _perform(self, action):
+        '''Carry out one input action, whether it came from the keyboard, the mouse or a script.'''
+        if self.pipeline is not None:
+            self.pipeline.submit(action) # the simulation thread carries it out before its next step
+            return
+        if self.lockstep is not None:
+            self.lockstep.submit(action) # both games carry it out on the same tick, a few ticks from now
+            return
+        if self.profiler.enabled and action in self.TIMED_INPUTS and self.state.current == GameState.PLAYING:
+            self.profiler.input_read(action, perf_counter()) # timed until a flip first shows what it did
+        self._carry_out(action)
+
+    def _carry_out(self, action):
+        '''Record action against the current tick and apply it to the game.'''
+        if self.recorder is not None:
+            self.recorder.record(self.tick, action) # tagged with the tick it takes effect on
+        if action == Action.MOVE_RIGHT:
+            self.ship.moving_right = True # set moving_right to true when the right key is pressed
+            if self.profiler.enabled and self.ship.moving_left:
+                self.profiler.input_had_no_effect(Action.MOVE_RIGHT) # with both keys down the ship stands still
+        elif action == Action.STOP_RIGHT:
+            self.ship.moving_right = False # set moving_right to false when right key is released
+            if self.profiler.enabled:
+                self.profiler.input_had_no_effect(Action.MOVE_RIGHT) # if the ship hadn't moved yet, it won't now
+        elif action == Action.MOVE_LEFT:
+            self.ship.moving_left = True # set moving_left to true when the left key is pressed
+            if self.profiler.enabled and self.ship.moving_right:
+                self.profiler.input_had_no_effect(Action.MOVE_LEFT)
+        elif action == Action.STOP_LEFT:
             self.ship.moving_left = False # set moving_left to false when left key is released
+            if self.profiler.enabled:
+                self.profiler.input_had_no_effect(Action.MOVE_LEFT)
+        elif action == Action.FIRE:
+            self._fire_bullet() # call _fire_bullet() when the spacebar is pressed
+        elif action == Action.PLAY:
+            self._start_game()
+        elif action == Action.QUIT:
+            self._quit()
+
+    def _quit(self):
+        '''Save anything that should outlive the game, then exit.'''
+        if self.settings.profiler_export:
+            self.profiler.export(self.settings.profiler_export)
+        if self.recorder is not None:
+            self.recorder.close(self.tick)
+        if self.capture is not None:
+            self.capture.close()
+            print(self.capture.format_report())
+        sys.exit()
+
+    def _make_fleet(self):
+        '''Create the group that holds the aliens, using the backend chosen in settings.'''
+        if self.settings.fleet_backend == 'numpy':
+            return NumpyFleet(self, self.alien_pool) # positions live in NumPy arrays, so the whole fleet moves in one operation
+        return Fleet(self, self.alien_pool)
 
     def _fire_bullet(self):
         '''Create a new bullet and add it to the bullets group.'''
-        if len(self.bullets) < self.settings.bullets_allowed: 
-            new_bullet = Bullet(self) # make an instance of Bullet
+        if len(self.bullets) < self.settings.bullets_allowed and self.state.current == GameState.PLAYING: # no firing during a pause
+            new_bullet = self.bullet_pool.acquire(self) # reuse a dead Bullet if there is one, otherwise make a new one
             self.bullets.add(new_bullet) # add instance to the group bullets using the add() method (similar to append)
+            if self.profiler.enabled:
+                self.profiler.input_took_effect(Action.FIRE) # the new bullet is drawn on the next flip
+        elif self.profiler.enabled:
+            self.profiler.input_had_no_effect(Action.FIRE)
         '''When the player presses the spacebar, we check the length of the bullets. If len(self.bullets) is less than three, 
         we create a new bullet. But if three bullets are already active, nothing happens when the spacebar is pressed.'''
 
-    def _update_bullets(self):
+    def _update_bullets(self, dt):
         '''Update position of bullets and get rid of old bullets.'''
         # Update bullet positions.
-        self.bullets.update() # calls bullet.update() for each bullet we place in the group bullets
+        self.bullets.update(dt) # calls bullet.update() for each bullet we place in the group bullets
 
         # Get rid of bullets that have disappeared.
-        for bullet in self.bullets.copy(): # copy() method to set up the for loop which enables us to modify bullets inside loop
-            if bullet.rect.bottom <= 0: # check each bullet to see whether it has disappeared off the top of the screen
-                self.bullets.remove(bullet) # remove it from bullets
+        # Every bullet starts at the top of the ship and moves at the same speed, so the oldest bullets are always the highest.
+        # That means the ones off the top of the screen are at the front of the group, and we can stop at the first one that isn't.
+        self.bullets.remove_leading(lambda bullet: bullet.rect.bottom <= 0)
+        if self.rival is not None:
+            self.rival.update_bullets(dt)
 
         self._check_bullet_alien_collision()
 
@@ -154,18 +397,22 @@ class AlienInvasion:
         be the alient that was hit.'''
         # Check for any bullets that have hit aliens.
         #   If so, get rid of the bullet and the alien. (The two True arguments will delete the bullets and aliens)
-        collisions = pygame.sprite.groupcollide(self.bullets, self.aliens, True, True)
+        collisions = self.aliens.collide_bullets(self.bullets) # same result as groupcollide(self.bullets, self.aliens, True, True)
 
         if collisions: # check whether the collisions dictionary exists
             for aliens in collisions.values(): # loop through all values in the dictionary to make sure we score all hits
                 self.stats.score += self.settings.alien_points * len(aliens) # if it does, the alien's value is added to the score
             self.sb.prep_score() # call to create new image for the updated score 
             self.sb.check_high_score() # call each time an alien is hit and after the score is updated
+        if self.rival is not None:
+            self.rival.check_bullet_alien_collision() # the second player's hits go to their own score
 
-        if not self.aliens: # check whether the aliens group is empty (an empty group evaluates to False)
-            # Destroy existing bullets and create new fleet.
+        if not self.aliens and self.state.current == GameState.PLAYING: # check whether the aliens group is empty (an empty group evaluates to False)
+            # Destroy existing bullets; the new fleet arrives when the level transition pause is over.
             self.bullets.empty() # get rid of any existing bullets by removing all remaining sprites from a group
-            self.__create_fleet() # fills the screen with aliens again
+            if self.rival is not None:
+                self.rival.bullets.empty()
+            self.state.enter(GameState.LEVEL_TRANSITION, self.settings.level_pause)
             self.settings.increase_speed() # increase the game's tempo after the last alien in a fleet has been shot down
 
             # Increase level.
@@ -174,50 +421,65 @@ class AlienInvasion:
 
     def _check_aliens_bottom(self):
         '''Check if any aliens have reached the bottom of the screen.'''
-        screen_rect = self.screen.get_rect()
-        for alien in self.aliens.sprites():
-            if alien.rect.bottom >= screen_rect.bottom:
-                # Treat this the same as if the ship got hit.
-                self.__ship_hit()
-                break # if one alien hits the bottom, there is no need to check the rest, so we break
+        if self.aliens.reached_bottom():
+            # Treat this the same as if the ship got hit.
+            self.__ship_hit()
 
-    def _update_aliens(self):
+    def _update_aliens(self, dt):
         '''Check if the fleet is at an edge, then update the positions of all aliens in the fleet.'''
         self._check_fleet_edges() 
-        self.aliens.update() # calls each alien's update() method
+        self.aliens.update(dt) # calls each alien's update() method
 
         '''The spritecollideany() function takes two arguments: a sprite and a group. The functions looks for any member of the group
         that has collided with the sprite and stops looking through the group as soon as it finds one member that has collided with
         the sprite. Here, it loops through the group aliens and returns the first alien it finds that has collided with the ship.'''
         # Look for alien-ship collisions.
-        if pygame.sprite.spritecollideany(self.ship, self.aliens): # if no collisions occur, the returns None and the if won't execute
+        if self.aliens.collide_any(self.ship): # if no collisions occur, the returns None and the if won't execute
             self.__ship_hit() # if it finds a collision, the if block will execute
+        elif self.rival is not None and self.rival.hit_by(self.aliens): # the players share their ships, so either can lose one
+            self.__ship_hit()
 
         # Look for aliens hitting the bottom of the screen.
-        self._check_aliens_bottom()
+        if not self.state.paused: # the ship was already hit this step; the fleet is replaced when the pause ends
+            self._check_aliens_bottom()
+
+    # What one step of play does, in order, under the profiler's name for each phase; _step() runs these whether or
+    # not they are timed, so the timed and untimed steps can't drift apart.
+    STEP_PHASES = {
+        'ship_update': _update_ships,
+        'update_bullets': _update_bullets, # includes the bullet-alien collision check
+        'update_aliens': _update_aliens,
+    }
 
     def __create_fleet(self):
         '''Create the fleet of aliens.'''
-        # Create an alien and find the number of aliens in a row.
-        # Spacing between each alien is equal to one alien width.
-        alien = Alien(self) # need to know width and height to place so we create an alien before calculations (not part of fleet)
-        alien_width, alien_height = alien.rect.size # get alien's width and height from the size attribute in the rect object
-        available_space_x = self.settings.screen_width - (2 * alien_width) # calculate the horizontal space available for aliens
-        number_aliens_x = available_space_x // (2 * alien_width) # calculate the number of aliens that can fit in that space
-
-        # Determine the number of rows of aliens that fit on the screen.
-        ship_height = self.ship.rect.height
-        available_space_y = self.settings.screen_height - (3 * alien_height) - ship_height # calculate number of rows fit on screen
-        number_rows = available_space_y // (2 * alien_height)
+        number_aliens_x, number_rows = self._fleet_layout()
 
         # Create the full fleet of aliens.
         for row_number in range(number_rows): # outer loop that counts from 0 to the number of rows we want
             for alien_number in range(number_aliens_x): # inner loop that creates the aliens in one row
                 self.__create_alien(alien_number, row_number) # helper method
 
+    def _fleet_layout(self):
+        '''Return how many aliens fit in a row and how many rows fit on the screen, working it out once per screen size.'''
+        screen_size = (self.settings.screen_width, self.settings.screen_height)
+        layout = self._fleet_layouts.get(screen_size)
+        if layout is None:
+            # Spacing between each alien is equal to one alien width.
+            alien_width, alien_height = assets.load_image(Alien.IMAGE).get_size() # the size of an alien, without making one
+            available_space_x = self.settings.screen_width - (2 * alien_width) # calculate the horizontal space available for aliens
+            number_aliens_x = available_space_x // (2 * alien_width) # calculate the number of aliens that can fit in that space
+
+            # Determine the number of rows of aliens that fit on the screen.
+            ship_height = self.ship.rect.height
+            available_space_y = self.settings.screen_height - (3 * alien_height) - ship_height # calculate number of rows fit on screen
+            number_rows = available_space_y // (2 * alien_height)
+            layout = self._fleet_layouts[screen_size] = (number_aliens_x, number_rows)
+        return layout
+
     def __create_alien(self, alien_number, row_number):
         '''Create an alien and place it in the row.'''
-        alien = Alien(self) # create a new alien
+        alien = self.alien_pool.acquire(self) # reuse a dead alien if there is one, otherwise create a new alien
         alien_width, alien_height = alien.rect.size # get the width and height inside method instead of passing as an argument
         alien.x = alien_width + 2 * alien_width * alien_number # set its x-coordinate value to place it in the row
         ''' ^ Each alien is pushed to the right one alien width from the left margin. We multiply alien width by 2 to account for 
@@ -229,16 +491,13 @@ class AlienInvasion:
 
     def _check_fleet_edges(self):
         '''Respond appropriately if any aliens have reached an edge.'''
-        for alien in self.aliens.sprites(): # loop through the fleet and call check_edges() for each alien
-            if alien.check_edges(): # if check_edges() returns True, we know alien is at the edge
-                self._change_fleet_direction()
-                break
+        if self.aliens.check_edges(): # if check_edges() returns True, we know an alien is at the edge
+            self._change_fleet_direction()
 
     def _change_fleet_direction(self):
         '''Drop the entire fleet and change the fleet's direction.'''
-        for alien in self.aliens.sprites(): # loop through all the aliens and drop each one using the setting fleet_drop_speed
-            alien.rect.y += self.settings.fleet_drop_speed
-        self.settings.fleet_direction *= -1 # line isn't part of the for loop because we only want to change direction once
+        self.aliens.drop(self.settings.fleet_drop_speed) # drop every alien using the setting fleet_drop_speed
+        self.settings.fleet_direction *= -1 # change direction once for the whole fleet
 
     def __ship_hit(self):
         '''Respond to the ship being hit by an alien.'''
@@ -247,39 +506,67 @@ class AlienInvasion:
             self.stats.ships_left -= 1 # reduce the number of ships left by 1 when an alien hits a ship
             self.sb.prep_ships() # updates the display of the ship images when the player loses a ship
 
-            # Get rid of any remaining aliens and bullets.
-            self.aliens.empty()
-            self.bullets.empty() # empty the groups aliens and bullets
-
-            # Create a new fleet and center the ship.
-            self.__create_fleet()
-            self.ship.center_ship()
-
-            # Pause.
-            sleep(0.5) # pauses program execution for a half second, long enough for the player to see that the alien has hit the ship
+            # Pause for a moment, long enough for the player to see that the alien has hit the ship. The game keeps drawing
+            # and handling events; when the pause runs out, _advance_pause() clears the screen and brings in a new fleet.
+            self.state.enter(GameState.RESPAWN_PAUSE, self.settings.ship_hit_pause)
         else:
             self.stats.game_active = False
-            pygame.mouse.set_visible(True) # make the cursor visible again as soon as the game becomes inactive
+            self.state.enter(GameState.GAME_OVER)
+            if self.pipeline is None:
+                pygame.mouse.set_visible(True) # make the cursor visible again as soon as the game becomes inactive
+
+    def _blit_layers(self):
+        '''Draw the ship, bullets and aliens with one blits() call, then the scoreboard with another.'''
+        sprites = [(self.ship.image, self.ship.rect)]
+        sprites.extend((bullet.image, bullet.rect) for bullet in self.bullets.sprites()) # pre-rendered, so no draw.rect() per bullet
+        if self.rival is not None:
+            sprites.append((self.rival.ship.image, self.rival.ship.rect))
+            sprites.extend((bullet.image, bullet.rect) for bullet in self.rival.bullets.sprites())
+        sprites.extend(self.aliens.blit_sequence())
+        self.screen.blits(sprites, doreturn=False) # doreturn=False skips building a list of rects we don't use
+        self.screen.blits(self.sb.hud_blits(), doreturn=False)
 
     def _update_screen(self):
+        if self.dirty_renderer is not None:
+            self.dirty_renderer.draw() # erase and redraw only what moved, then update just those areas
+            if self.profiler.enabled:
+                self.profiler.frame_shown()
+            if self.capture is not None:
+                self.capture.grab(self.tick)
+            return
+
         # redraw the screen during each pass through the loop
         self.screen.fill(self.settings.bg_color) # fill the screen with the background color; fill() acts on a surface
         # we use self.settings to access the background color when filling the screen
-        self.ship.blitme() # draws the ship on the screen on top of the background
-        for bullet in self.bullets.sprites(): # bullets.sprites() returns a list of all sprites in the group bullets 
-            bullet.draw_bullet() # loop through bullets.sprites() and call draw_bullet() on each one to draw fired bullets to screen
-        self.aliens.draw(self.screen) # draw() on a group draws each element in the group at the position defined by its rect attribute
-
-        # Draw the score information.
-        self.sb.show_score()
+        if self.settings.batched_blits:
+            self._blit_layers()
+        else:
+            self.ship.blitme() # draws the ship on the screen on top of the background
+            for bullet in self.bullets.sprites(): # bullets.sprites() returns a list of all sprites in the group bullets 
+                bullet.draw_bullet() # loop through bullets.sprites() and call draw_bullet() on each one to draw fired bullets to screen
+            if self.rival is not None:
+                self.rival.ship.blitme()
+                for bullet in self.rival.bullets.sprites():
+                    bullet.draw_bullet()
+            self.aliens.draw(self.screen) # draw() on a group draws each element in the group at the position defined by its rect attribute
+
+            # Draw the score information.
+            self.sb.show_score()
         
         # Draw the play button if the game is inactive.
         # to make play button visible above other elements, we draw it after the other elements, but before flipping to new screen
         if not self.stats.game_active:
             self.play_button.draw_button()
 
+        if self.profiler.overlay_visible:
+            self.profiler.draw_overlay(self.screen)
+
         # Make the most recently drawn screen visible.
         pygame.display.flip()
+        if self.profiler.enabled:
+            self.profiler.frame_shown() # inputs whose effect this frame shows get their latency recorded
+        if self.capture is not None:
+            self.capture.grab(self.tick) # only copies the frame; another thread writes it to disk
         ''' draws an empty screen on each pass through the while loop, erasing the old screen so only the new screen is
         visible. When we move the game elements around, pygame.display.flip() continually updates the display to show the
         new positions of game elements and hides the old ones, creating the illusion of smooth movement.'''
@@ -0,0 +1,97 @@
+import os
+
+import pygame
+
+# Magenta isn't in any of our images, so surfaces composed from several of them fill their empty parts with it and use it
+# as their colorkey.
+COLORKEY = (255, 0, 255)
+
+class AssetCache:
+    '''A process-wide registry that loads each image and font only once.'''
+
+    def __init__(self):
+        '''Initialize an empty cache and its counters.'''
+        self.images = {} # maps an image path to the Surface every sprite shares
+        self.fonts = {} # maps (font name, size) to the Font every piece of text in that style shares
+        self.masks = {} # maps (image, background color) to that image's collision mask
+        self.loads = 0 # how many times we actually read an image file from disk
+        self.hits = 0 # how many times an image was handed out without touching the disk
+        self.bytes_read = 0 # size of the image files read from disk
+        self.bytes_cached = 0 # size of the decoded pixel data kept in memory
+
+    def load_image(self, path):
+        '''Return the shared Surface for path, loading it the first time it is asked for.'''
+        image = self.images.get(path)
+        if image is not None:
+            self.hits += 1
+            return image
+
+        image = pygame.image.load(path)
+        self.loads += 1
+        self.bytes_read += os.path.getsize(path)
+
+        # Match the display's pixel format so blits don't convert the image every frame.
+        # convert() needs a display mode, so images loaded before set_mode() are kept as they are.
+        if pygame.display.get_surface() is not None:
+            image = image.convert()
+
+        self.bytes_cached += image.get_bytesize() * image.get_width() * image.get_height()
+        self.images[path] = image
+        return image
+
+    def load_font(self, name, size):
+        '''Return the shared Font for name and size, like pygame.font.SysFont(name, size), looking it up only once.'''
+        key = (name, size)
+        font = self.fonts.get(key)
+        if font is None:
+            # SysFont() searches the system's fonts for a name, which is slow, so it happens once per name and size.
+            font = pygame.font.SysFont(name, size)
+            self.fonts[key] = font
+        return font
+
+    def solid_surface(self, size, color):
+        '''Return a shared Surface of size filled with color, so plain rectangles can be blitted like images.'''
+        key = ('solid', tuple(size), tuple(color))
+        image = self.images.get(key)
+        if image is not None:
+            self.hits += 1
+            return image
+
+        image = pygame.Surface(size)
+        if pygame.display.get_surface() is not None:
+            image = image.convert()
+        image.fill(color)
+        self.bytes_cached += image.get_bytesize() * image.get_width() * image.get_height()
+        self.images[key] = image
+        return image
+
+    def load_mask(self, image, background):
+        '''Return the shared collision mask of image, in which pixels of the background color count as empty.'''
+        key = (image, tuple(background))
+        mask = self.masks.get(key)
+        if mask is None:
+            # Our bitmaps have no transparency; their corners are painted the screen's background color instead.
+            mask = pygame.mask.from_threshold(image, background, (1, 1, 1, 255)) # sets the pixels that match background
+            mask.invert()
+            self.masks[key] = mask
+        return mask
+
+    def report(self):
+        '''Return a dictionary with the cache counters.'''
+        return {
+            'images': len(self.images),
+            'fonts': len(self.fonts),
+            'masks': len(self.masks),
+            'loads': self.loads,
+            'hits': self.hits,
+            'bytes_read': self.bytes_read,
+            'bytes_cached': self.bytes_cached,
+        }
+
+    def format_report(self):
+        '''Return report() as one line of text.'''
+        return ("assets: {images} images, {fonts} fonts and {masks} masks cached ({bytes_cached:,} bytes); "
+                "{loads} files read ({bytes_read:,} bytes), {hits} requests served from the cache".format(**self.report()))
+
+# Every sprite imports this one instance so they all share the same images.
+assets = AssetCache()
@@ -0,0 +1,239 @@
+'''Benchmark Alien Invasion by driving standard scenarios headlessly. Results are written as JSON and compared
+against a stored baseline; the run fails (exit status 1) if any scenario got slower or bigger than the baseline allows.
+
+Each scenario is timed a few times and the best run is kept, since a slow run is usually the machine doing something
+else. The baseline records the machine it was made on; speed is only compared on that machine, memory everywhere.
+
+    python benchmark.py                      # run every scenario and compare with benchmark_baseline.json
+    python benchmark.py --save-baseline      # run and store the results as the new baseline
+    python benchmark.py --require-baseline   # as the first example, but fail if there's no baseline to compare with
+    python benchmark.py --set fleet_backend=numpy --only huge_fleet_8k'''
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tracemalloc
+
+import pygame
+
+from alien_invasion import AlienInvasion
+from settings import Settings
+from game_state import GameState
+from actions import Action
+from headless import HeadlessRunner, patrol_script, parse_override
+from frame_profiler import percentile
+from asset_cache import assets
+
+class Scenario:
+    '''A class to describe one benchmark scenario.'''
+
+    def __init__(self, name, size, ticks, fire_every=10, setup=None, on_tick=None):
+        '''Initialize the scenario.'''
+        self.name = name
+        self.size = size # virtual screen size
+        self.ticks = ticks
+        self.fire_every = fire_every # fire a bullet every this many ticks (1 means constant fire)
+        self.setup = setup # called with the game after it has started
+        self.on_tick = on_tick # called with (game, tick) before every tick
+
+def _setup_level_15(ai_game):
+    '''Speed the game up as if the player had cleared 14 fleets.'''
+    for _ in range(14):
+        ai_game.settings.increase_speed()
+    ai_game.stats.level = 15
+    ai_game.sb.prep_level()
+
+def _setup_bullet_storm(ai_game):
+    '''Let the player have 500 bullets on screen.'''
+    ai_game.settings.bullets_allowed = 500
+
+def _respawn_fleet(ai_game, tick):
+    '''Lose a ship every 50 ticks of play, which throws the fleet away and builds a new one after the pause.'''
+    if tick and tick % 50 == 0 and ai_game.state.current == GameState.PLAYING:
+        ai_game._AlienInvasion__ship_hit()
+
+class _KeepPlaying:
+    '''Gives the player a ship back whenever they run out, so every run lasts the full number of ticks.'''
+
+    def __init__(self, on_tick=None):
+        '''Wrap the scenario's own per-tick function, if it has one.'''
+        self.on_tick = on_tick
+
+    def __call__(self, ai_game, tick):
+        '''Top up the ships, then run the scenario's function.'''
+        if ai_game.stats.ships_left < 1:
+            ai_game.stats.ships_left = 1
+        if self.on_tick is not None:
+            self.on_tick(ai_game, tick)
+
+SCENARIOS = [
+    Scenario('level_1', (1200, 800), 3000),
+    Scenario('level_15', (1200, 800), 3000, setup=_setup_level_15),
+    Scenario('huge_fleet_8k', (7680, 4320), 600, fire_every=5),
+    Scenario('bullet_storm', (1200, 800), 2000, fire_every=1, setup=_setup_bullet_storm),
+    Scenario('fleet_respawns', (1200, 800), 2000, on_tick=_respawn_fleet),
+]
+
+# How much worse than the baseline each metric may get before the run fails, as a fraction of the baseline. p99 comes
+# from a few dozen ticks, so one hiccup from the OS can double it; it only fails the run when it's much worse than that.
+HIGHER_IS_BETTER = {'ticks_per_sec': 0.2}
+LOWER_IS_BETTER = {'p99_ms': 1.5, 'peak_memory_kb': 0.1}
+# The metrics that depend on how fast the machine is, so they're only compared with a baseline made on the same one.
+MACHINE_METRICS = ('ticks_per_sec', 'p99_ms')
+
+def machine():
+    '''Return a description of this machine and the versions that change how fast the game runs.'''
+    return {
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpus': os.cpu_count(),
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+    }
+
+def _make_game(scenario, overrides):
+    '''Build and start a headless game for scenario.'''
+    settings = Settings()
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    ai_game = AlienInvasion(headless=True, screen_size=scenario.size, settings=settings)
+    ai_game._perform(Action.PLAY)
+    if scenario.setup is not None:
+        scenario.setup(ai_game)
+    return ai_game
+
+def run_scenario(scenario, overrides, scale=1.0, measure_memory=True, repeats=3):
+    '''Run one scenario repeats times and return the metrics of the best run.'''
+    ticks = max(1, int(scenario.ticks * scale))
+    script = patrol_script(ticks, fire_every=scenario.fire_every, start=False)
+
+    runs = [_timed_run(scenario, overrides, ticks, script) for _ in range(repeats)]
+    result = max(runs, key=lambda run: run['ticks_per_sec']) # the run the rest of the machine got in the way of least
+    for metric in ('p50_ms', 'p95_ms', 'p99_ms'):
+        result[metric] = min(run[metric] for run in runs)
+    result['repeats'] = repeats
+
+    # Separate run for memory, because tracing every allocation slows the game down a lot. It's the same every time,
+    # so once is enough.
+    if measure_memory:
+        tracemalloc.start() # before the game is built, so the fleet, the pools and the cached images count too
+        ai_game = _make_game(scenario, overrides)
+        HeadlessRunner(ai_game, script, on_tick=_KeepPlaying(scenario.on_tick)).run(ticks)
+        result['peak_memory_kb'] = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+    return result
+
+def _timed_run(scenario, overrides, ticks, script):
+    '''Run one scenario once, with the profiler collecting the time of every tick, and return its metrics.'''
+    ai_game = _make_game(scenario, dict(overrides, profiler_enabled=True, profiler_samples=ticks))
+    gc_before = sum(stats['collections'] for stats in gc.get_stats())
+    report = HeadlessRunner(ai_game, script, on_tick=_KeepPlaying(scenario.on_tick)).run(ticks)
+    gc_collections = sum(stats['collections'] for stats in gc.get_stats()) - gc_before
+
+    frame_times = sorted(sum(frame) for frame in zip(*(ai_game.profiler.recent(phase) for phase in ai_game.profiler.PHASES)))
+    return {
+        'ticks': report['ticks'],
+        'ticks_per_sec': report['ticks_per_sec'],
+        'p50_ms': 1000 * percentile(frame_times, 50),
+        'p95_ms': 1000 * percentile(frame_times, 95),
+        'p99_ms': 1000 * percentile(frame_times, 99),
+        'sprite_allocations': ai_game.bullet_pool.allocations + ai_game.alien_pool.allocations,
+        'bullet_pool': ai_game.bullet_pool.report(),
+        'alien_pool': ai_game.alien_pool.report(),
+        'gc_collections': gc_collections,
+        'startup_ms': 1000 * sum(ai_game.startup_times.values()), # reported, but too noisy to fail the run on
+        'mask_checks_per_tick': ai_game.aliens.mask_checks / max(1, report['ticks']), # zero unless precise_collisions is on
+        # Of those, the share whose rects overlapped but whose pixels didn't: the hits the rect test alone would have got wrong.
+        'mask_miss_rate': ai_game.aliens.mask_misses / max(1, ai_game.aliens.mask_checks),
+    }
+
+def compare(results, baseline, tolerance=None, same_machine=True):
+    '''Return a list of messages describing every metric that regressed past the baseline, and a list of the scenarios
+    the baseline has nothing for. tolerance replaces every metric's own tolerance when it's given; when the baseline
+    came from another machine, only the metrics that don't depend on the machine are compared.'''
+    regressions = []
+    unchecked = []
+    for name, metrics in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            unchecked.append(name)
+            continue
+        for metric, allowed in HIGHER_IS_BETTER.items():
+            if not same_machine and metric in MACHINE_METRICS:
+                continue
+            allowed = allowed if tolerance is None else tolerance
+            if metric in expected and metrics.get(metric, 0) < expected[metric] * (1 - allowed):
+                regressions.append("{}: {} fell to {:.1f} (baseline {:.1f})".format(name, metric, metrics[metric], expected[metric]))
+        for metric, allowed in LOWER_IS_BETTER.items():
+            if not same_machine and metric in MACHINE_METRICS:
+                continue
+            allowed = allowed if tolerance is None else tolerance
+            if metric in expected and metric in metrics and metrics[metric] > expected[metric] * (1 + allowed):
+                regressions.append("{}: {} rose to {:.1f} (baseline {:.1f})".format(name, metric, metrics[metric], expected[metric]))
+    return regressions, unchecked
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the Alien Invasion benchmark scenarios.')
+    parser.add_argument('--only', nargs='+', help='run only these scenarios')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiply the number of ticks in every scenario')
+    parser.add_argument('--set', dest='overrides', action='append', type=parse_override, default=[],
+                        help='override a setting, e.g. --set fleet_backend=numpy')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc pass')
+    parser.add_argument('--output', default='benchmark_results.json', help='where to write the results')
+    parser.add_argument('--baseline', default='benchmark_baseline.json', help='stored results to compare against')
+    parser.add_argument('--repeats', type=int, default=3, help='time every scenario this many times and keep the best')
+    parser.add_argument('--tolerance', type=float,
+                        help="allowed fractional regression for every metric (0.15 = 15%%) instead of each metric's own")
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the new baseline')
+    parser.add_argument('--require-baseline', action='store_true',
+                        help='fail instead of warning when the baseline is missing or has no results for a scenario')
+    args = parser.parse_args()
+
+    overrides = dict(args.overrides)
+    results = {}
+    for scenario in SCENARIOS:
+        if args.only and scenario.name not in args.only:
+            continue
+        metrics = run_scenario(scenario, overrides, args.scale, not args.no_memory, args.repeats)
+        results[scenario.name] = metrics
+        print("{:<16} {ticks_per_sec:>9,.0f} ticks/s  p50 {p50_ms:.3f}ms  p95 {p95_ms:.3f}ms  p99 {p99_ms:.3f}ms  "
+              "allocs {sprite_allocations}  gc {gc_collections}  masks {mask_checks_per_tick:.2f}/tick ({mask_miss_rate:.0%} missed)".format(scenario.name, **metrics)
+              + ("  peak {:,.0f}KB".format(metrics['peak_memory_kb']) if 'peak_memory_kb' in metrics else ''))
+        print("{:<16} pools: bullets {hits} reused, {allocations} allocated; ".format('', **metrics['bullet_pool'])
+              + "aliens {hits} reused, {allocations} allocated".format(**metrics['alien_pool']))
+
+    print(assets.format_report()) # the cache is shared by every scenario, so this covers the whole run
+
+    stored = {'machine': machine(), 'settings': overrides, 'results': results}
+    with open(args.output, 'w') as file_object:
+        json.dump(stored, file_object, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as file_object:
+            json.dump(stored, file_object, indent=2)
+        print("Saved baseline to " + args.baseline)
+    elif not os.path.exists(args.baseline):
+        # Nothing to compare with would otherwise look just like a clean run.
+        print("WARNING no baseline at {}, so nothing was checked (run with --save-baseline to make one)".format(args.baseline),
+              file=sys.stderr)
+        if args.require_baseline:
+            sys.exit(1)
+    else:
+        with open(args.baseline) as file_object:
+            baseline = json.load(file_object)
+        same_machine = baseline.get('machine') == stored['machine']
+        if not same_machine:
+            checked = [metric for metric in list(HIGHER_IS_BETTER) + list(LOWER_IS_BETTER) if metric not in MACHINE_METRICS]
+            print("WARNING {} was made on another machine ({}), so only {} was checked".format(
+                args.baseline, baseline.get('machine'), ', '.join(checked)), file=sys.stderr)
+        regressions, unchecked = compare(results, baseline.get('results', {}), args.tolerance, same_machine)
+        for message in regressions:
+            print("REGRESSION " + message)
+        for name in unchecked:
+            print("WARNING {} has no results for {}, so it wasn't checked".format(args.baseline, name), file=sys.stderr)
+        if regressions or (unchecked and args.require_baseline):
+            sys.exit(1)
+        print("No regressions against " + args.baseline)
@@ -1,4 +1,7 @@
-import pygame.font # lets pygame render text to the screen
+import pygame
+
+from glyph_cache import glyphs
+from asset_cache import assets
 
 class Button:
 
@@ -11,7 +14,7 @@ class Button:
         self.width, self.height = 200, 50
         self.button_color = (0, 255, 0) # set button's color to bright green
         self.text_color = (255, 255, 255) # set text color to white
-        self.font = pygame.font.SysFont(None, 48) # None argument tells pygame to use default font, and 48 specifies the font size
+        self.font = assets.load_font(None, 48) # None argument tells pygame to use default font, and 48 specifies the font size
 
         # Build the button's rect object and center it.
         self.rect = pygame.Rect(0, 0, self.width, self.height)
@@ -22,9 +25,9 @@ class Button:
 
     def _prep_msg(self, msg):
         '''Turn msg into a rendered image and center text on the button.'''
-        self.msg_image = self.font.render(msg, True, self.text_color, self.button_color) # font.render() turns text to an image
-        '''The font.render() method takes a Boolean value to turn antialiasing on or off (antialiasing makes the edges of the text
-        smoother). The remaining arguments are the specified font and background color.'''
+        self.msg_image = glyphs.render(self.font, msg, self.text_color, self.button_color) # turns text to an image from cached letters
+        '''The glyph cache renders each letter once with font.render(), with antialiasing on (antialiasing makes the edges of the
+        text smoother), and reuses it for every image that needs that letter in the same font and colors.'''
         self.msg_image_rect = self.msg_image.get_rect() # center the text image on the button
         self.msg_image_rect.center = self.rect.center
 
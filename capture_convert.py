@@ -0,0 +1,66 @@
+'''Turn a capture file written by frame_capture.py into one image per frame.
+
+    python capture_convert.py session.aicap frames/                        # every frame as frames/frame_000123.png
+    python capture_convert.py session.aicap frames/ --every 10 --format bmp  # every tenth frame as bitmaps
+    python capture_convert.py session.aicap --info                        # only describe what the file holds'''
+
+import argparse
+import os
+
+import pygame
+
+from frame_capture import CaptureReader
+
+def frame_surface(reader):
+    '''Return a surface laid out exactly like the screen the frames were captured from.'''
+    return pygame.Surface(reader.size, 0, reader.bitsize, reader.masks)
+
+def fill_surface(surface, reader, data):
+    '''Copy one frame's pixel data into surface.'''
+    buffer = surface.get_buffer()
+    pitch = surface.get_pitch()
+    if pitch == reader.pitch:
+        buffer.write(bytes(data))
+        return
+    row_bytes = min(pitch, reader.pitch) # the rows were padded differently, so copy them one at a time
+    for row in range(reader.size[1]):
+        start = row * reader.pitch
+        buffer.write(bytes(data[start:start + row_bytes]), row * pitch)
+
+def convert(reader, output_dir, every=1, image_format='png'):
+    '''Save every every-th frame of reader to output_dir and return how many images were saved.'''
+    os.makedirs(output_dir, exist_ok=True)
+    surface = frame_surface(reader) # reused for every frame
+    saved = 0
+    for index, (frame_number, tick, seconds, data) in enumerate(reader.frames()):
+        if index % every:
+            continue
+        fill_surface(surface, reader, data)
+        pygame.image.save(surface, os.path.join(output_dir, "frame_{:06d}.{}".format(frame_number, image_format)))
+        saved += 1
+    return saved
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert an Alien Invasion frame capture into images.')
+    parser.add_argument('path', help='a capture file written with capture_path set')
+    parser.add_argument('output_dir', nargs='?', help='where to write the images')
+    parser.add_argument('--every', type=int, default=1, help='only keep every this many frames')
+    parser.add_argument('--format', dest='image_format', default='png', choices=('png', 'bmp', 'jpg', 'tga'),
+                        help='image file type')
+    parser.add_argument('--info', action='store_true', help='describe the capture instead of converting it')
+    args = parser.parse_args()
+
+    reader = CaptureReader(args.path)
+    if args.info or not args.output_dir:
+        frames = list(reader.frames(pixels=False))
+        gaps = sum(1 for before, after in zip(frames, frames[1:]) if after[0] != before[0] + 1)
+        print("{} frames of {}x{}, {}; {} gaps where frames were dropped".format(
+            reader.count, reader.size[0], reader.size[1],
+            "zlib level {}".format(reader.compression) if reader.compression else "raw", gaps))
+        if frames:
+            print("frames {} to {}, ticks {} to {}, {:.2f}s".format(frames[0][0], frames[-1][0], frames[0][1],
+                                                                    frames[-1][1], frames[-1][2] - frames[0][2]))
+    else:
+        saved = convert(reader, args.output_dir, args.every, args.image_format)
+        print("saved {} images to {}".format(saved, args.output_dir))
+    reader.close()
@@ -0,0 +1,76 @@
+'''Lighter building blocks for sprites that exist in the thousands. pygame's Sprite gives every instance its own set
+of groups and a dictionary of attributes; CompactSprite keeps its groups in a tuple and its subclasses declare
+__slots__, and SpriteContext holds the screen and settings once per game instead of once per sprite.'''
+
+from pygame.sprite import Sprite
+
+class SpriteContext:
+    '''The game objects every sprite needs, kept once per game instead of copied into every sprite.'''
+
+    __slots__ = ('screen', 'screen_rect', 'settings')
+
+    def __init__(self, screen, settings):
+        '''Initialize the context from the game's screen and settings.'''
+        self.screen = screen
+        self.screen_rect = screen.get_rect() # the screen never changes size once the game has started
+        self.settings = settings
+
+class CompactSprite(Sprite):
+    '''A Sprite that remembers its groups in a tuple instead of a set.
+
+    Our sprites belong to one group at a time, and an empty set costs more than the rest of an alien put together.
+    Every method of Sprite that looks at the groups is replaced, so groups treat it exactly like a Sprite.'''
+
+    __slots__ = ('_groups',)
+
+    def __init__(self, *groups):
+        '''Initialize the sprite, adding it to groups.'''
+        # Sprite.__init__() isn't called, because all it does is make the set this class replaces.
+        self._groups = () # the groups the sprite is in
+        if groups:
+            self.add(*groups)
+
+    def add(self, *groups):
+        '''Add the sprite to groups (or to the groups inside any iterables given).'''
+        for group in groups:
+            if hasattr(group, '_spritegroup'):
+                if group not in self._groups:
+                    group.add_internal(self)
+                    self.add_internal(group)
+            else:
+                self.add(*group)
+
+    def remove(self, *groups):
+        '''Remove the sprite from groups (or from the groups inside any iterables given).'''
+        for group in groups:
+            if hasattr(group, '_spritegroup'):
+                if group in self._groups:
+                    group.remove_internal(self)
+                    self.remove_internal(group)
+            else:
+                self.remove(*group)
+
+    def add_internal(self, group):
+        '''Record that the sprite is now in group.'''
+        self._groups += (group,)
+
+    def remove_internal(self, group):
+        '''Record that the sprite has left group.'''
+        self._groups = tuple(member for member in self._groups if member is not group)
+
+    def kill(self):
+        '''Remove the sprite from every group it is in.'''
+        for group in self._groups:
+            group.remove_internal(self)
+        self._groups = ()
+
+    def groups(self):
+        '''Return a list of the groups the sprite is in.'''
+        return list(self._groups)
+
+    def alive(self):
+        '''Return True if the sprite is in any group.'''
+        return bool(self._groups)
+
+    def __repr__(self):
+        return "<{} Sprite(in {} groups)>".format(self.__class__.__name__, len(self._groups))
@@ -0,0 +1,82 @@
+import pygame
+
+class DirtyRenderer:
+    '''A class that repaints only the parts of the screen that changed instead of filling and flipping the whole screen.'''
+
+    def __init__(self, ai_game):
+        '''Initialize the renderer for a game.'''
+        self.ai_game = ai_game
+        self.screen = ai_game.screen
+        self.settings = ai_game.settings
+        self.previous_rects = [] # everything drawn last frame; these areas have to be erased this frame
+        self.button_visible = None # unknown until the first frame, which forces a full redraw
+        self.full_redraw = True
+
+        # Counters so we can see how often the cheap path is used.
+        self.frames = 0
+        self.full_frames = 0
+
+    def request_full_redraw(self):
+        '''Repaint the whole screen on the next frame.'''
+        self.full_redraw = True
+
+    def draw(self):
+        '''Erase what moved, draw the current frame and send only the changed areas to the display.'''
+        ai_game = self.ai_game
+        screen = self.screen
+        bg_color = self.settings.bg_color
+
+        # The Play button covers the middle of the screen, so showing or hiding it repaints everything.
+        button_visible = not ai_game.stats.game_active
+        if button_visible != self.button_visible:
+            self.button_visible = button_visible
+            self.full_redraw = True
+
+        if self.full_redraw:
+            screen.fill(bg_color)
+        else:
+            for rect in self.previous_rects: # paint the background back over last frame's sprites
+                screen.fill(bg_color, rect)
+
+        drawn_rects = []
+        ai_game.ship.blitme()
+        drawn_rects.append(ai_game.ship.rect.copy())
+
+        bullets = ai_game.bullets.sprites()
+        if ai_game.rival is not None:
+            ai_game.rival.ship.blitme()
+            drawn_rects.append(ai_game.rival.ship.rect.copy())
+            bullets += ai_game.rival.bullets.sprites()
+        if self.settings.batched_blits:
+            screen.blits([(bullet.image, bullet.rect) for bullet in bullets], doreturn=False)
+        else:
+            for bullet in bullets:
+                bullet.draw_bullet()
+        drawn_rects.extend(bullet.rect.copy() for bullet in bullets)
+
+        fleet_rect = ai_game.aliens.bounds() # one rect for the whole fleet band
+        if fleet_rect is not None:
+            ai_game.aliens.draw(screen)
+            drawn_rects.append(fleet_rect)
+
+        if self.settings.batched_blits:
+            screen.blits(ai_game.sb.hud_blits(), doreturn=False)
+        else:
+            ai_game.sb.show_score()
+        drawn_rects.extend(ai_game.sb.hud_rects())
+
+        if button_visible:
+            ai_game.play_button.draw_button()
+            drawn_rects.append(ai_game.play_button.rect.copy())
+
+        if ai_game.profiler.overlay_visible:
+            drawn_rects.append(ai_game.profiler.draw_overlay(screen))
+
+        self.frames += 1
+        if self.full_redraw:
+            pygame.display.flip()
+            self.full_frames += 1
+            self.full_redraw = False
+        else:
+            pygame.display.update(self.previous_rects + drawn_rects) # old positions need clearing, new ones need showing
+        self.previous_rects = drawn_rects
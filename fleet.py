@@ -0,0 +1,414 @@
+'''The fleet is the group that holds every alien. The plain Fleet walks the aliens one at a time like a normal sprite group;
+NumpyFleet keeps the positions in NumPy arrays so moving, dropping and checking the fleet are single vectorized operations.'''
+
+from bisect import insort
+
+import pygame
+
+from spatial_hash import SpatialHash
+from sprite_pool import PooledGroup
+from asset_cache import assets, COLORKEY
+
+try:
+    import numpy
+except ImportError: # NumPy is optional; only the numpy backend needs it
+    numpy = None
+
+class Fleet(PooledGroup):
+    '''A sprite group that holds the aliens and answers questions about the whole fleet.'''
+
+    def __init__(self, ai_game, pool=None):
+        '''Initialize an empty fleet; removed aliens go back to pool.'''
+        super().__init__(pool)
+        self.screen = ai_game.screen
+        self.settings = ai_game.settings
+        # Optional grid that lets collision checks look only at the aliens near a bullet.
+        self.use_index = self.settings.collision_broadphase == 'spatial_hash'
+        self.index = None # made when the first alien arrives, because the cell size comes from the alien rect
+
+        # Optional pixel-perfect collisions: pairs whose rects overlap are checked again with the images' masks.
+        self.precise = self.settings.precise_collisions
+        self.mask_checks = 0 # pairs that got past the rect test and had their masks compared
+        self.mask_misses = 0 # of those, pairs whose rects overlapped but whose pixels didn't touch
+        self.alien_width = self.alien_height = 0
+
+        # The aliens grouped by the column and row they joined the formation in. The formation only ever moves as a whole,
+        # so every alien in a column has the same x and every alien in a row the same y; the edges of the fleet are the
+        # edges of any alien in the outermost live column or row, and finding them doesn't depend on the fleet size.
+        self.columns = {} # x when added -> the aliens in that column (a dict used as an ordered set)
+        self.rows = {} # y when added -> the aliens in that row
+        self.column_keys = [] # the keys of columns, kept sorted
+        self.row_keys = [] # the keys of rows, kept sorted
+
+        # Optionally draw the fleet as one pre-composed surface, since the aliens never move relative to each other.
+        self.use_formation = self.settings.formation_surface
+        self.formation = None # composed on the next draw after aliens are added
+        self.formation_origin = (0, 0) # the spot, in the aliens' starting positions, of the formation's top left corner
+
+    def add_internal(self, sprite, layer=None):
+        '''Add an alien to the group and to the collision index.'''
+        super().add_internal(sprite, layer)
+        self.alien_width, self.alien_height = sprite.rect.size # every alien is the same size
+        sprite.fleet_column = sprite.rect.x
+        sprite.fleet_row = sprite.rect.y
+        _join(self.columns, self.column_keys, sprite.fleet_column, sprite)
+        _join(self.rows, self.row_keys, sprite.fleet_row, sprite)
+        self.formation = None # the new alien isn't in the formation surface yet
+        if self.use_index:
+            if self.index is None:
+                # Cells match the formation spacing: one alien plus one alien-sized gap in each direction.
+                self.index = SpatialHash(2 * sprite.rect.width, 2 * sprite.rect.height)
+            self.index.insert(sprite, sprite.rect)
+
+    def remove_internal(self, sprite):
+        '''Remove an alien from the group and from the collision index.'''
+        super().remove_internal(sprite)
+        _leave(self.columns, self.column_keys, sprite.fleet_column, sprite)
+        _leave(self.rows, self.row_keys, sprite.fleet_row, sprite)
+        if self.index is not None:
+            self.index.remove(sprite)
+        if self.formation is not None: # paint the dead alien's cell transparent
+            origin_x, origin_y = self.formation_origin
+            self.formation.fill(COLORKEY, (sprite.fleet_column - origin_x, sprite.fleet_row - origin_y,
+                                           self.alien_width, self.alien_height))
+
+    def empty(self):
+        '''Remove every alien and reset the collision index.'''
+        self.formation = None # no point erasing the cells one at a time
+        super().empty()
+        if self.index is not None:
+            self.index.clear()
+        self.columns.clear()
+        self.rows.clear()
+        self.column_keys.clear()
+        self.row_keys.clear()
+
+    def _moved(self, dx, dy):
+        '''Keep the collision index in step after the whole fleet moves by (dx, dy).'''
+        if self.index is not None:
+            self.index.translate(dx, dy)
+
+    def update(self, dt):
+        '''Move every alien right or left; dt is the length of the step in seconds.'''
+        super().update(dt) # calls each alien's update() method
+        self._moved(self.settings.alien_speed * self.settings.fleet_direction * dt, 0)
+
+    def _pixels_touch(self, sprite, alien):
+        '''Return True if the opaque pixels of sprite and alien overlap; only called once their rects are known to.'''
+        self.mask_checks += 1
+        background = self.settings.bg_color
+        alien_x, alien_y = self._position(alien)
+        offset = (alien_x - sprite.rect.x, alien_y - sprite.rect.y)
+        if assets.load_mask(sprite.image, background).overlap(assets.load_mask(alien.image, background), offset) is None:
+            self.mask_misses += 1
+            return False
+        return True
+
+    def _collide_precise(self, sprite, alien):
+        '''The collided function for pygame's collision helpers: the cheap rect test first, then the masks.'''
+        return sprite.rect.colliderect(alien.rect) and self._pixels_touch(sprite, alien)
+
+    def _rect(self, alien):
+        '''Return alien's current rect.'''
+        return alien.rect
+
+    def collide_bullets(self, bullets):
+        '''Remove bullets and aliens that collide; return the same dictionary as groupcollide(bullets, aliens, True, True).'''
+        if self.index is None:
+            return pygame.sprite.groupcollide(bullets, self, True, True, self._collide_precise if self.precise else None)
+
+        collisions = {}
+        for bullet in bullets.sprites():
+            bullet_rect = bullet.rect
+            hits = [alien for alien in self.index.query(bullet_rect) if bullet_rect.colliderect(self._rect(alien))]
+            if hits and self.precise:
+                hits = [alien for alien in hits if self._pixels_touch(bullet, alien)]
+            if hits:
+                for alien in hits:
+                    alien.kill()
+                collisions[bullet] = hits
+                bullet.kill()
+        return collisions
+
+    def collide_any(self, sprite):
+        '''Return an alien that collides with sprite, or None, like spritecollideany(sprite, aliens).'''
+        if self.index is None:
+            return pygame.sprite.spritecollideany(sprite, self, self._collide_precise if self.precise else None)
+
+        sprite_rect = sprite.rect
+        for alien in self.index.query(sprite_rect):
+            if sprite_rect.colliderect(self._rect(alien)) and (not self.precise or self._pixels_touch(sprite, alien)):
+                return alien
+        return None
+
+    def _position(self, alien):
+        '''Return the current (x, y) of alien's rect.'''
+        return alien.rect.x, alien.rect.y
+
+    def bounds(self):
+        '''Return a rect around every live alien, or None if the whole fleet has been shot down.'''
+        if not self.column_keys:
+            return None
+        # Any alien in the outermost column or row will do, since they all share that edge.
+        left = self._position(next(iter(self.columns[self.column_keys[0]])))[0]
+        right = self._position(next(iter(self.columns[self.column_keys[-1]])))[0] + self.alien_width
+        top = self._position(next(iter(self.rows[self.row_keys[0]])))[1]
+        bottom = self._position(next(iter(self.rows[self.row_keys[-1]])))[1] + self.alien_height
+        return pygame.Rect(left, top, right - left, bottom - top)
+
+    def check_edges(self):
+        '''Return True if any alien is at an edge of the screen.'''
+        bounds = self.bounds()
+        if bounds is None:
+            return False
+        return bounds.right >= self.screen.get_rect().right or bounds.left <= 0 # the same test as Alien.check_edges()
+
+    def positions(self):
+        '''Return the (x, y) of every alien as a list of new tuples.'''
+        return [alien.rect.topleft for alien in self.sprites()]
+
+    def blit_sequence(self):
+        '''Return (image, position) pairs for every alien, ready to hand to Surface.blits().'''
+        if self.use_formation:
+            return self._formation_blits()
+        return [(alien.image, alien.rect) for alien in self.sprites()]
+
+    def draw(self, surface):
+        '''Draw every alien; the formation surface, when it's turned on, takes a single blit.'''
+        if self.use_formation:
+            surface.blits(self._formation_blits(), doreturn=False)
+            return []
+        return super().draw(surface)
+
+    def _formation_blits(self):
+        '''Return the one (surface, position) pair that draws the whole formation where the fleet is now.'''
+        if not self.spritedict:
+            return []
+        if self.formation is None:
+            self._build_formation()
+        # Any live alien shows how far the formation has moved. Each alien rounds its own float x, so now and then a
+        # column is really a pixel off from this for one frame; collisions always use the aliens' real rects.
+        alien = next(iter(self.spritedict))
+        x, y = self._position(alien)
+        origin_x, origin_y = self.formation_origin
+        return [(self.formation, (origin_x + x - alien.fleet_column, origin_y + y - alien.fleet_row))]
+
+    def _build_formation(self):
+        '''Compose every alien into one surface at its starting position; the gaps between them are transparent.'''
+        left, top = self.column_keys[0], self.row_keys[0]
+        width = self.column_keys[-1] + self.alien_width - left
+        height = self.row_keys[-1] + self.alien_height - top
+        formation = pygame.Surface((width, height))
+        if pygame.display.get_surface() is not None:
+            formation = formation.convert() # the whole fleet is blitted from this every frame, so give it the screen's format
+        formation.fill(COLORKEY) # every cell starts out empty
+        formation.set_colorkey(COLORKEY, pygame.RLEACCEL) # run-length encoding lets the blit skip the gaps quickly
+        formation.blits([(alien.image, (alien.fleet_column - left, alien.fleet_row - top)) for alien in self.spritedict],
+                        doreturn=False)
+        self.formation = formation
+        self.formation_origin = (left, top)
+
+    def drop(self, distance):
+        '''Move every alien down by distance pixels.'''
+        for alien in self.sprites():
+            alien.rect.y += distance
+        self._moved(0, distance)
+
+    def reached_bottom(self):
+        '''Return True if any alien has reached the bottom of the screen.'''
+        bounds = self.bounds()
+        return bounds is not None and bounds.bottom >= self.screen.get_rect().bottom
+
+class NumpyFleet(Fleet):
+    '''A fleet that keeps alien positions and alive flags in NumPy arrays (struct of arrays).'''
+
+    def __init__(self, ai_game, pool=None, capacity=64):
+        '''Initialize the arrays that hold the fleet.'''
+        if numpy is None:
+            raise ImportError("The numpy fleet backend needs NumPy; install it or set fleet_backend to 'sprites'.")
+        super().__init__(ai_game, pool)
+        self.x = numpy.zeros(capacity) # exact horizontal positions, like Alien.x
+        self.rect_x = numpy.zeros(capacity, dtype=numpy.int64) # horizontal rect positions
+        self.y = numpy.zeros(capacity, dtype=numpy.int64) # vertical rect positions
+        self.alive = numpy.zeros(capacity, dtype=bool)
+        self.members = [] # the Alien sprite that owns each slot in the arrays
+        self.count = 0 # number of slots in use
+        self.rects_stale = False # True when the arrays have moved on and the sprites' rects haven't caught up yet
+
+    def add_internal(self, sprite, layer=None):
+        '''Give a newly added alien a slot in the arrays.'''
+        super().add_internal(sprite, layer)
+        if self.count == len(self.x): # out of room, so double the size of every array
+            self.x = numpy.resize(self.x, 2 * self.count)
+            self.rect_x = numpy.resize(self.rect_x, 2 * self.count)
+            self.y = numpy.resize(self.y, 2 * self.count)
+            self.alive = numpy.resize(self.alive, 2 * self.count)
+
+        slot = self.count
+        self.count += 1
+        sprite.fleet_slot = slot
+        self.members.append(sprite)
+        self.x[slot] = sprite.x
+        self.rect_x[slot] = sprite.rect.x
+        self.y[slot] = sprite.rect.y
+        self.alive[slot] = True
+
+    def remove_internal(self, sprite):
+        '''Mark a removed alien's slot as dead.'''
+        super().remove_internal(sprite)
+        self.alive[sprite.fleet_slot] = False
+        if not self.spritedict: # the fleet was shot down, so the next one can start again from the first slot
+            self.members.clear()
+            self.count = 0
+            self.rects_stale = False
+
+    def empty(self):
+        '''Remove every alien and free all the slots.'''
+        super().empty()
+        self.members.clear()
+        self.count = 0
+        self.rects_stale = False
+
+    def sprites(self):
+        '''Return the aliens, with their rects brought up to date with the arrays.'''
+        self.sync_rects()
+        return super().sprites()
+
+    def __bool__(self):
+        '''Return True while any alien is left; Group's version builds the sprite list, which would sync every rect.'''
+        return bool(self.spritedict)
+
+    def __len__(self):
+        '''Return how many aliens are left, without syncing their rects.'''
+        return len(self.spritedict)
+
+    def sync_rects(self):
+        '''Copy the array positions back into each alien's x and rect.'''
+        if not self.rects_stale:
+            return
+        n = self.count
+        alive = self.alive[:n]
+        for alien, is_alive, x, rect_x, y in zip(self.members, alive.tolist(), self.x[:n].tolist(),
+                                                 self.rect_x[:n].tolist(), self.y[:n].tolist()):
+            if is_alive:
+                alien.x = x
+                alien.rect.x = rect_x
+                alien.rect.y = y
+        self.rects_stale = False
+
+    def update(self, dt):
+        '''Move the whole fleet right or left in one operation.'''
+        n = self.count
+        dx = self.settings.alien_speed * self.settings.fleet_direction * dt # the same sum Alien.update() does
+        self.x[:n] += dx
+        self.rect_x[:n] = _round_like_rect(self.x[:n])
+        self.rects_stale = True
+        self._moved(dx, 0)
+
+    def _position(self, alien):
+        '''Return alien's (x, y) from the arrays, which may be ahead of its rect.'''
+        slot = alien.fleet_slot
+        return int(self.rect_x[slot]), int(self.y[slot])
+
+    def _rect(self, alien):
+        '''Return alien's rect as the arrays have it, without touching the sprite.'''
+        return pygame.Rect(self._position(alien), (self.alien_width, self.alien_height))
+
+    def _overlaps(self, rects):
+        '''Return a boolean array with a row for each of rects and a column for each slot, True where a live alien's
+        rect overlaps that rect; every pair is tested at once.'''
+        n = self.count
+        edges = numpy.array([(rect.left, rect.right, rect.top, rect.bottom) for rect in rects]).reshape(-1, 4, 1)
+        left = self.rect_x[:n]
+        top = self.y[:n]
+        return (self.alive[:n] & (left < edges[:, 1]) & (left + self.alien_width > edges[:, 0])
+                & (top < edges[:, 3]) & (top + self.alien_height > edges[:, 2]))
+
+    def collide_bullets(self, bullets):
+        '''Like Fleet.collide_bullets(), but without the spatial hash the rect test runs on the arrays.'''
+        if self.index is not None:
+            return super().collide_bullets(bullets)
+
+        collisions = {}
+        bounds = self.bounds()
+        if bounds is None:
+            return collisions
+        # Only the bullets inside the fleet's outline can hit anything, and usually that's none of them.
+        bullet_list = [bullet for bullet in bullets.sprites() if bounds.colliderect(bullet.rect)]
+        if not bullet_list:
+            return collisions
+        overlaps = self._overlaps([bullet.rect for bullet in bullet_list])
+        members = self.members
+        alive = self.alive
+        for bullet, row in zip(bullet_list, overlaps):
+            # Slots are handed out in group order, so the hits come out in the order groupcollide() would find them.
+            hits = [members[slot] for slot in numpy.flatnonzero(row).tolist() if alive[slot]] # an earlier bullet may have got it
+            if hits and self.precise:
+                hits = [alien for alien in hits if self._pixels_touch(bullet, alien)]
+            if hits:
+                for alien in hits:
+                    alien.kill()
+                collisions[bullet] = hits
+                bullet.kill()
+        return collisions
+
+    def collide_any(self, sprite):
+        '''Like Fleet.collide_any(), but without the spatial hash the rect test runs on the arrays.'''
+        if self.index is not None:
+            return super().collide_any(sprite)
+
+        bounds = self.bounds()
+        if bounds is None or not bounds.colliderect(sprite.rect):
+            return None
+        for slot in numpy.flatnonzero(self._overlaps([sprite.rect])[0]).tolist():
+            alien = self.members[slot]
+            if not self.precise or self._pixels_touch(sprite, alien):
+                return alien
+        return None
+
+    def drop(self, distance):
+        '''Move every alien down by distance pixels.'''
+        self.y[:self.count] += distance
+        self.rects_stale = True
+        self._moved(0, distance)
+
+    def positions(self):
+        '''Return the (x, y) of every live alien, straight from the arrays.'''
+        n = self.count
+        alive = self.alive[:n]
+        return list(zip(self.rect_x[:n][alive].tolist(), self.y[:n][alive].tolist()))
+
+    def blit_sequence(self):
+        '''Return (image, position) pairs for every live alien, straight from the arrays.'''
+        if self.use_formation:
+            return self._formation_blits()
+        n = self.count
+        alive = self.alive[:n].tolist()
+        positions = zip(self.rect_x[:n].tolist(), self.y[:n].tolist())
+        return [(alien.image, pos) for alien, pos, is_alive in zip(self.members, positions, alive) if is_alive]
+
+    def draw(self, surface):
+        '''Draw every live alien with one batched blit.'''
+        surface.blits(self.blit_sequence(), doreturn=False)
+
+def _join(groups, keys, key, alien):
+    '''Add alien to the column or row key in groups, adding key to the sorted keys if it is new.'''
+    group = groups.get(key)
+    if group is None:
+        group = groups[key] = {}
+        insort(keys, key)
+    group[alien] = None
+
+def _leave(groups, keys, key, alien):
+    '''Take alien out of its column or row, dropping the key once the column or row is empty.'''
+    group = groups[key]
+    del group[alien]
+    if not group:
+        del groups[key]
+        keys.remove(key) # only happens when a whole column or row is shot down
+
+def _round_like_rect(values):
+    '''Round floats to ints the way pygame does when a float is assigned to a rect (halves round away from zero).'''
+    truncated = numpy.trunc(values)
+    halves = numpy.abs(values - truncated) == 0.5
+    return numpy.where(halves, truncated + numpy.sign(values), numpy.rint(values)).astype(numpy.int64)
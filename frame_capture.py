@@ -0,0 +1,171 @@
+'''Record the frames the game presents to a memory-mapped file without slowing the game down.
+
+The game thread only copies each presented frame into a free buffer from a small preallocated ring and hands it to a
+writer thread, which compresses it (or not) and streams it into the file. When the writer falls behind and no buffer is
+free, the frame is dropped rather than making the game wait, and the drop is counted.
+
+A capture file starts with a header (pixel layout, compression level, how many frames and bytes are in the file so far)
+followed by frames. Every frame is a FRAME record (frame number, tick, time, stored length) and the pixel data, as raw
+screen memory or compressed with zlib. The header is updated after every frame, so a file cut short is still readable.
+capture_convert.py turns a capture file into images.'''
+
+import mmap
+import queue
+import struct
+import threading
+import zlib
+from time import perf_counter
+
+MAGIC = b'AICP'
+VERSION = 1
+# magic, version, width, height, pitch, bits per pixel, red/green/blue/alpha masks, zlib level (0 means raw),
+# frames written and the offset just past the last one
+HEADER = struct.Struct('<4sBIIIB4IBIQ')
+COUNTS = struct.Struct('<IQ') # the last two fields of HEADER, rewritten after every frame
+COUNTS_OFFSET = HEADER.size - COUNTS.size
+FRAME = struct.Struct('<IIdI') # frame number, tick, seconds since the capture started, length of the data that follows
+
+# Put on the queue of filled buffers to stop the writer thread.
+_STOP = None
+
+class FrameCapture:
+    '''A class that copies presented frames into a ring of buffers and writes them to a file on a background thread.'''
+
+    def __init__(self, screen, settings):
+        '''Make the ring of buffers, map the file and start the writer thread.'''
+        self.screen = screen
+        width, height = screen.get_size()
+        self.pitch = screen.get_pitch() # bytes per row of pixels, which may be more than width times the pixel size
+        self.frame_size = self.pitch * height
+        self.compression = settings.capture_compression
+
+        # Every buffer is made now, so grabbing a frame never allocates; a buffer is either free or waiting to be written.
+        self.free = queue.SimpleQueue()
+        self.filled = queue.SimpleQueue()
+        for _ in range(settings.capture_ring_size):
+            buffer = bytearray(self.frame_size)
+            self.free.put((buffer, memoryview(buffer)))
+
+        # The file is made full size up front and mapped into memory, so writing a frame is just copying it there.
+        self.path = settings.capture_path
+        self.file = open(self.path, 'w+b')
+        self.file.truncate(settings.capture_file_mb * 1024 * 1024)
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        self.map[:HEADER.size] = HEADER.pack(MAGIC, VERSION, width, height, self.pitch, screen.get_bitsize(),
+                                             *screen.get_masks(), self.compression, 0, HEADER.size)
+        self.end = HEADER.size # where the next frame goes
+
+        # Metrics.
+        self.frames = 0 # frames presented while capturing, counting the dropped ones
+        self.dropped = 0 # frames dropped because every buffer was still waiting for the writer
+        self.written = 0
+        self.out_of_space = 0 # frames the writer dropped because the file was full
+        self.bytes_in = 0 # screen memory of the frames in the file
+        self.bytes_out = 0 # bytes the writer put in the file
+
+        self.start = perf_counter()
+        self.thread = threading.Thread(target=self._write_frames, name='frame capture', daemon=True)
+        self.thread.start()
+
+    def grab(self, tick):
+        '''Copy the screen into a free buffer for the writer, or drop the frame if there isn't one.'''
+        frame_number = self.frames
+        self.frames += 1
+        try:
+            buffer, view = self.free.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            return
+        with memoryview(self.screen.get_view('1')) as pixels, pixels.cast('B') as raw:
+            view[:] = raw # a straight copy of the screen's memory; the writer turns it into something smaller
+        self.filled.put((buffer, view, frame_number, tick, perf_counter() - self.start))
+
+    def _write_frames(self):
+        '''The writer thread: compress every filled buffer, put it in the file and give the buffer back.'''
+        while True:
+            item = self.filled.get()
+            if item is _STOP:
+                return
+            buffer, view, frame_number, tick, seconds = item
+            if self.compression:
+                data = zlib.compress(buffer, self.compression)
+                self.free.put((buffer, view)) # the compressed copy is all that's needed now, so the buffer can be reused
+                self._store(frame_number, tick, seconds, data)
+            else:
+                self._store(frame_number, tick, seconds, view)
+                self.free.put((buffer, view))
+
+    def _store(self, frame_number, tick, seconds, data):
+        '''Append one frame to the file and update the header, or count it as dropped if it doesn't fit.'''
+        start = self.end + FRAME.size
+        end = start + len(data)
+        if end > len(self.map):
+            self.out_of_space += 1
+            return
+        FRAME.pack_into(self.map, self.end, frame_number, tick, seconds, len(data))
+        self.map[start:end] = data
+        self.end = end
+        self.written += 1
+        self.bytes_in += self.frame_size
+        self.bytes_out += FRAME.size + len(data)
+        COUNTS.pack_into(self.map, COUNTS_OFFSET, self.written, self.end)
+
+    def close(self):
+        '''Write every frame still in the ring, then cut the file down to the frames in it.'''
+        if self.file.closed:
+            return
+        self.filled.put(_STOP)
+        self.thread.join()
+        self.map.flush()
+        self.map.close()
+        self.file.truncate(self.end)
+        self.file.close()
+
+    def report(self):
+        '''Return the capture metrics.'''
+        return {
+            'frames': self.frames,
+            'written': self.written,
+            'dropped': self.dropped,
+            'out_of_space': self.out_of_space,
+            'megabytes': self.bytes_out / (1024 * 1024),
+            'ratio': self.bytes_in / self.bytes_out if self.bytes_out else 0.0,
+        }
+
+    def format_report(self):
+        '''Return report() as one line of text.'''
+        return ("capture: {written} of {frames} frames written ({megabytes:.1f}MB, compressed {ratio:.1f}:1), "
+                "{dropped} dropped with the ring full, {out_of_space} with the file full".format(**self.report()))
+
+class CaptureReader:
+    '''A class that reads the frames of a capture file back.'''
+
+    def __init__(self, path):
+        '''Map the file and read its header.'''
+        with open(path, 'rb') as file_object:
+            self.map = mmap.mmap(file_object.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, width, height, self.pitch, self.bitsize, *masks, self.compression, self.count,
+         self.end) = HEADER.unpack_from(self.map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("{} is not an Alien Invasion capture this version can read".format(path))
+        self.size = (width, height)
+        self.masks = tuple(masks)
+
+    def frames(self, pixels=True):
+        '''Yield (frame number, tick, seconds, pixel data) for every frame in the file, in order; the pixel data is
+        None when pixels is False, which skips decompressing it.'''
+        position = HEADER.size
+        for _ in range(self.count):
+            frame_number, tick, seconds, length = FRAME.unpack_from(self.map, position)
+            position += FRAME.size
+            data = None
+            if pixels:
+                data = self.map[position:position + length]
+                if self.compression:
+                    data = zlib.decompress(data)
+            position += length
+            yield frame_number, tick, seconds, data
+
+    def close(self):
+        '''Unmap the file.'''
+        self.map.close()
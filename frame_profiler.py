@@ -0,0 +1,184 @@
+import csv
+import json
+from time import perf_counter
+
+import pygame
+
+from asset_cache import assets
+
+class FrameProfiler:
+    '''A class that times each phase of a frame and keeps the most recent samples in a ring buffer.'''
+
+    PHASES = ('check_events', 'ship_update', 'update_bullets', 'update_aliens', 'update_screen')
+    MAX_INPUT_WAIT = 1.0 # seconds an input can wait for an effect before it's counted as having none
+
+    def __init__(self, settings):
+        '''Initialize the profiler and its ring buffer.'''
+        self.settings = settings
+        self.enabled = settings.profiler_enabled # when False, run_game doesn't call into the profiler at all
+        self.overlay_visible = False
+        self.size = settings.profiler_samples # how many frames the ring buffer remembers
+
+        # One preallocated list per phase, written in a circle so recording a frame never allocates.
+        self.samples = {phase: [0.0] * self.size for phase in self.PHASES}
+        self.index = 0 # where the next frame goes
+        self.count = 0 # how many slots hold real samples
+        self.current = dict.fromkeys(self.PHASES, 0.0) # time spent in each phase during the frame being recorded
+
+        # Input-to-display latency: an input waits here from when it is read until a frame showing its effect is flipped.
+        self.waiting_inputs = [] # [action, time read, whether its effect has happened yet]
+        self.latencies = [0.0] * self.size # another ring, filled one input at a time rather than one frame at a time
+        self.latency_index = 0
+        self.latency_count = 0
+        # Inputs that never changed what's on screen, like a shot over the bullet limit or a key let go before the ship moved.
+        self.inputs_without_effect = 0
+
+        # The overlay is only re-rendered every few frames so drawing it doesn't distort what it measures.
+        self.font = None
+        self.overlay_image = None
+        self.overlay_age = 0
+
+    def add(self, phase, seconds):
+        '''Add time spent in phase to the current frame.'''
+        self.current[phase] += seconds
+
+    def end_frame(self):
+        '''Store the current frame in the ring buffer and start a new one.'''
+        index = self.index
+        current = self.current
+        for phase in self.PHASES:
+            self.samples[phase][index] = current[phase]
+            current[phase] = 0.0
+        self.index = (index + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+
+    def input_read(self, action, seconds):
+        '''Start timing an input read at seconds (a perf_counter() time).'''
+        if len(self.waiting_inputs) >= self.size: # nothing is being flipped (a headless run that doesn't draw)
+            self.waiting_inputs.pop(0)
+            self.inputs_without_effect += 1
+        self.waiting_inputs.append([action, seconds, False])
+
+    def input_took_effect(self, action):
+        '''Note that the oldest waiting input of this kind has changed the game, so the next flip shows it.'''
+        for waiting in self.waiting_inputs:
+            if waiting[0] == action and not waiting[2]:
+                waiting[2] = True
+                return
+
+    def input_had_no_effect(self, action):
+        '''Stop timing waiting inputs of this kind that haven't changed anything; they never will.'''
+        kept = [waiting for waiting in self.waiting_inputs if waiting[0] != action or waiting[2]]
+        self.inputs_without_effect += len(self.waiting_inputs) - len(kept)
+        self.waiting_inputs = kept
+
+    def frame_shown(self):
+        '''Record the latency of every waiting input whose effect the frame just flipped shows.'''
+        if not self.waiting_inputs:
+            return
+        now = perf_counter()
+        kept = []
+        for waiting in self.waiting_inputs:
+            if waiting[2]:
+                self.latencies[self.latency_index] = now - waiting[1]
+                self.latency_index = (self.latency_index + 1) % self.size
+                if self.latency_count < self.size:
+                    self.latency_count += 1
+            elif now - waiting[1] < self.MAX_INPUT_WAIT:
+                kept.append(waiting)
+            else:
+                self.inputs_without_effect += 1
+        self.waiting_inputs = kept
+
+    def recent(self, phase):
+        '''Return the stored samples for phase in seconds, oldest first.'''
+        ring = self.samples[phase]
+        if self.count < self.size:
+            return ring[:self.count]
+        return ring[self.index:] + ring[:self.index]
+
+    def summary(self):
+        '''Return the mean, p95 and p99 of each phase in milliseconds.'''
+        summary = {}
+        for phase in self.PHASES:
+            values = sorted(self.recent(phase))
+            summary[phase] = {
+                'mean': 1000 * sum(values) / len(values) if values else 0.0,
+                'p95': 1000 * percentile(values, 95),
+                'p99': 1000 * percentile(values, 99),
+            }
+        return summary
+
+    def input_latency(self):
+        '''Return the p50 and p99 input-to-display latency in milliseconds and how many inputs they cover.'''
+        values = sorted(self.latencies[:self.latency_count]) # order doesn't matter here, so the ring needn't be unrolled
+        return {
+            'inputs': len(values),
+            'p50': 1000 * percentile(values, 50),
+            'p99': 1000 * percentile(values, 99),
+            'without_effect': self.inputs_without_effect,
+        }
+
+    def toggle_overlay(self):
+        '''Show or hide the overlay; showing it turns sampling on.'''
+        self.overlay_visible = not self.overlay_visible
+        self.enabled = self.overlay_visible or self.settings.profiler_enabled
+        self.overlay_image = None
+
+    def draw_overlay(self, screen):
+        '''Draw the per-phase statistics in the bottom left corner and return the rect that was drawn.'''
+        if self.overlay_image is None or self.overlay_age >= self.settings.profiler_overlay_interval:
+            self._prep_overlay()
+        self.overlay_age += 1
+        rect = self.overlay_image.get_rect()
+        rect.bottomleft = (10, screen.get_rect().bottom - 10)
+        screen.blit(self.overlay_image, rect)
+        return rect
+
+    def _prep_overlay(self):
+        '''Render the statistics into the overlay image.'''
+        if self.font is None:
+            self.font = assets.load_font(None, 24)
+        text_color, bg_color = (255, 255, 255), (30, 30, 30)
+        lines = ["{:<15} {:>7} {:>7} {:>7}".format('phase (ms)', 'mean', 'p95', 'p99')]
+        for phase, stats in self.summary().items():
+            lines.append("{:<15} {mean:7.3f} {p95:7.3f} {p99:7.3f}".format(phase, **stats))
+        lines.append("input->flip ms  p50 {p50:.1f}  p99 {p99:.1f}  ({inputs} inputs)".format(**self.input_latency()))
+
+        images = [self.font.render(line, True, text_color, bg_color) for line in lines]
+        width = max(image.get_width() for image in images) + 10
+        height = sum(image.get_height() for image in images) + 10
+        self.overlay_image = pygame.Surface((width, height))
+        self.overlay_image.fill(bg_color)
+        y = 5
+        for image in images:
+            self.overlay_image.blit(image, (5, y))
+            y += image.get_height()
+        self.overlay_age = 0
+
+    def export(self, path):
+        '''Write the stored samples to path as CSV or JSON, depending on its extension.'''
+        columns = [self.recent(phase) for phase in self.PHASES]
+        if path.endswith('.json'):
+            data = {
+                'phases': list(self.PHASES),
+                'frames': [[1000 * value for value in frame] for frame in zip(*columns)],
+                'summary': self.summary(),
+                'input_latency': self.input_latency(),
+            }
+            with open(path, 'w') as file_object:
+                json.dump(data, file_object, indent=2)
+        else:
+            with open(path, 'w', newline='') as file_object:
+                writer = csv.writer(file_object)
+                writer.writerow(['frame'] + [phase + '_ms' for phase in self.PHASES])
+                for frame_number, frame in enumerate(zip(*columns)):
+                    writer.writerow([frame_number] + ["{:.4f}".format(1000 * value) for value in frame])
+
+def percentile(sorted_values, percent):
+    '''Return the nearest-rank percentile of an already sorted list.'''
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-percent * len(sorted_values) // 100)) # ceiling of percent% of the count
+    return sorted_values[int(rank) - 1]
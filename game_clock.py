@@ -0,0 +1,31 @@
+import pygame
+
+class GameClock:
+    '''A clock that runs the game logic in fixed steps and caps how often frames are drawn.'''
+
+    def __init__(self, settings):
+        '''Initialize the clock from the timing settings.'''
+        self.settings = settings
+        self.clock = pygame.time.Clock() # pygame's clock sleeps between frames so we don't pin a core
+        self.dt = 1 / settings.sim_rate # every simulation step covers exactly this many seconds
+        self.accumulator = 0.0 # real time that has passed but hasn't been simulated yet
+
+    def tick(self, active):
+        '''Wait for the next frame, then return how many simulation steps to run before drawing it.'''
+        # Draw at the normal frame cap while playing; on the Play screen nothing moves, so sleep more.
+        fps = self.settings.max_fps if active else self.settings.idle_fps
+        elapsed = self.clock.tick(fps) / 1000 # tick() returns milliseconds since the last frame
+
+        if not active:
+            self.accumulator = 0.0 # time spent on the Play screen shouldn't be made up for later
+            return 0
+
+        self.accumulator += elapsed
+        steps = int(self.accumulator / self.dt)
+        if steps > self.settings.max_steps_per_frame:
+            # The machine can't keep up; drop the backlog rather than falling further and further behind.
+            steps = self.settings.max_steps_per_frame
+            self.accumulator = 0.0
+        else:
+            self.accumulator -= steps * self.dt
+        return steps
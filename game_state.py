@@ -0,0 +1,27 @@
+class GameState:
+    '''A class to track which phase the game is in and how long a timed pause has left.'''
+
+    PLAYING = 'playing'
+    RESPAWN_PAUSE = 'respawn_pause' # the ship was just hit; everything freezes for a moment
+    LEVEL_TRANSITION = 'level_transition' # the fleet was just destroyed; the next one arrives shortly
+    GAME_OVER = 'game_over' # no ships left (or no game started yet); the Play button is showing
+
+    def __init__(self):
+        '''Start on the Play screen.'''
+        self.current = self.GAME_OVER
+        self.time_left = 0.0 # game time, in seconds, until a pause ends
+
+    def enter(self, state, duration=0.0):
+        '''Switch to state; pauses last duration seconds of game time.'''
+        self.current = state
+        self.time_left = duration
+
+    @property
+    def paused(self):
+        '''Return True during a timed pause.'''
+        return self.current in (self.RESPAWN_PAUSE, self.LEVEL_TRANSITION)
+
+    def advance(self, dt):
+        '''Count down a pause by one step of dt seconds; return True when the pause has just run out.'''
+        self.time_left -= dt
+        return self.time_left <= 1e-9 # allow for rounding so a 0.5s pause is exactly 60 steps at 120 steps per second
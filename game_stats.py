@@ -16,4 +16,5 @@ class GameStats:
         '''Initialize statistics that can change during the game.'''
         self.ships_left = self.settings.ship_limit
         self.score = 0 # will reset the score each time a new game starts
+        self.rival_score = 0 # the second player's score in a two-player game
         self.level = 1 # resets the level at the start of each new game
\ No newline at end of file
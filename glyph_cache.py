@@ -0,0 +1,69 @@
+import pygame
+
+class GlyphCache:
+    '''A class that renders each character once and builds text images by blitting the cached characters.'''
+
+    # Characters every score, high score and level image is made of, rendered as soon as an atlas is created.
+    PRELOAD = '0123456789,'
+
+    def __init__(self):
+        '''Initialize an empty cache.'''
+        self.atlases = {} # maps (font, color, background) to a dictionary of character images
+        self.glyphs_rendered = 0 # how many times font.render() actually ran
+        self.texts_built = 0 # how many text images were put together from cached glyphs
+
+    def _atlas(self, font, color, bg_color):
+        '''Return the glyph dictionary for this font and colors, making it the first time.'''
+        key = (font, tuple(color), tuple(bg_color) if bg_color is not None else None)
+        atlas = self.atlases.get(key)
+        if atlas is None:
+            atlas = {}
+            self.atlases[key] = atlas
+            for char in self.PRELOAD:
+                self._glyph(atlas, font, char, color, bg_color)
+        return atlas
+
+    def _glyph(self, atlas, font, char, color, bg_color):
+        '''Return the image for one character, rendering it if it isn't cached yet.'''
+        glyph = atlas.get(char)
+        if glyph is None:
+            glyph = font.render(char, True, color, bg_color)
+            self.glyphs_rendered += 1
+            atlas[char] = glyph
+        return glyph
+
+    def render(self, font, text, color, bg_color=None):
+        '''Return an image of text, like font.render(text, True, color, bg_color).'''
+        atlas = self._atlas(font, color, bg_color)
+        glyphs = [self._glyph(atlas, font, char, color, bg_color) for char in text]
+
+        width = sum(glyph.get_width() for glyph in glyphs)
+        height = max([glyph.get_height() for glyph in glyphs] + [font.get_height()])
+        if bg_color is None:
+            image = pygame.Surface((width, height), pygame.SRCALPHA) # transparent, like text rendered without a background
+        else:
+            image = pygame.Surface((width, height))
+            image.fill(bg_color)
+
+        x = 0
+        for glyph in glyphs: # place the characters side by side
+            image.blit(glyph, (x, 0))
+            x += glyph.get_width()
+        self.texts_built += 1
+        return image
+
+    def report(self):
+        '''Return a dictionary with the cache counters.'''
+        return {
+            'atlases': len(self.atlases),
+            'glyphs_rendered': self.glyphs_rendered,
+            'texts_built': self.texts_built,
+        }
+
+    def format_report(self):
+        '''Return report() as one line of text.'''
+        return "glyphs: {glyphs_rendered} rendered into {atlases} atlases, {texts_built} texts built from them".format(
+            **self.report())
+
+# The scoreboard and the buttons share one cache.
+glyphs = GlyphCache()
@@ -0,0 +1,128 @@
+'''Run Alien Invasion without a window, as fast as the CPU allows, using scripted input instead of the keyboard and mouse.
+This is useful on machines without a display and for measuring how fast the game logic itself runs.'''
+
+import argparse
+import ast
+from time import perf_counter
+
+from alien_invasion import AlienInvasion
+from actions import Action
+from settings import Settings
+from asset_cache import assets
+from glyph_cache import glyphs
+
+class HeadlessRunner:
+    '''A class to drive a headless game with scripted input.'''
+
+    def __init__(self, ai_game, script=None, render=False, on_tick=None):
+        '''Initialize the runner with a game and a script.'''
+        self.ai_game = ai_game
+        # The script maps a tick number to the list of actions performed before that tick runs.
+        self.script = script if script is not None else {0: [Action.PLAY]}
+        self.render = render # drawing is optional so we can time the game logic on its own
+        self.on_tick = on_tick # optional function called with (ai_game, tick) before each tick, for things a script can't do
+        self.ticks = 0
+
+    def run(self, max_ticks):
+        '''Run until max_ticks have passed or the game is over, and return a report.'''
+        ai_game = self.ai_game
+        start = perf_counter()
+        reason = 'ticks'
+        while self.ticks < max_ticks:
+            for action in self.script.get(self.ticks, ()): # scripted input takes the place of pygame.event.get()
+                ai_game._perform(action)
+            if self.on_tick is not None:
+                self.on_tick(ai_game, self.ticks)
+
+            if not ai_game.stats.game_active: # the player ran out of ships (or the game was never started)
+                reason = 'game_over'
+                break
+
+            # Every tick is one fixed step of game time, run back to back with no sleeping; with the profiler on, every
+            # tick also counts as a frame.
+            profiler = ai_game.profiler if ai_game.profiler.enabled else None
+            ai_game._step(ai_game.clock.dt, profiler)
+            if self.render:
+                render_start = perf_counter()
+                ai_game._update_screen()
+                if profiler is not None:
+                    profiler.add('update_screen', perf_counter() - render_start)
+            if profiler is not None:
+                profiler.end_frame()
+            self.ticks += 1
+        elapsed = perf_counter() - start
+
+        return {
+            'ticks': self.ticks,
+            'seconds': elapsed,
+            'ticks_per_sec': self.ticks / elapsed if elapsed > 0 else 0.0,
+            'reason': reason,
+            'score': ai_game.stats.score,
+            'level': ai_game.stats.level,
+            'ships_left': ai_game.stats.ships_left,
+        }
+
+def patrol_script(max_ticks, fire_every=10, turn_every=400, start=True):
+    '''Build a script that starts the game (unless start is False), sweeps the ship back and forth and keeps firing.'''
+    script = {0: [Action.PLAY, Action.MOVE_RIGHT] if start else [Action.MOVE_RIGHT]}
+    moving_right = True
+    for tick in range(1, max_ticks):
+        actions = []
+        if tick % turn_every == 0: # turn around every so often so the ship covers the whole screen
+            if moving_right:
+                actions += [Action.STOP_RIGHT, Action.MOVE_LEFT]
+            else:
+                actions += [Action.STOP_LEFT, Action.MOVE_RIGHT]
+            moving_right = not moving_right
+        if fire_every and tick % fire_every == 0:
+            actions.append(Action.FIRE)
+        if actions:
+            script[tick] = actions
+    return script
+
+def parse_size(text):
+    '''Turn a string like 1920x1080 into a (width, height) tuple.'''
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+def parse_override(text):
+    '''Turn name=value into a (name, value) pair for a setting, reading value as a Python literal when possible.'''
+    name, value = text.split('=', 1)
+    try:
+        value = ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        pass # plain strings like numpy don't need quotes
+    return name, value
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run Alien Invasion headless and report ticks per second.')
+    parser.add_argument('--ticks', type=int, default=10000, help='stop after this many ticks')
+    parser.add_argument('--size', type=parse_size, default=(1200, 800), help='virtual screen size, e.g. 1920x1080')
+    parser.add_argument('--render', action='store_true', help='also draw every tick to an offscreen surface')
+    parser.add_argument('--capture', help='write every drawn frame to this file (implies --render)')
+    parser.add_argument('--set', dest='overrides', action='append', type=parse_override, default=[],
+                        help='override a setting, e.g. --set render_mode=dirty')
+    args = parser.parse_args()
+
+    settings = Settings()
+    settings.capture_path = args.capture
+    for name, value in args.overrides:
+        setattr(settings, name, value)
+    ai = AlienInvasion(headless=True, screen_size=args.size, settings=settings)
+    print("startup " + ", ".join("{} {:.2f}ms".format(stage, 1000 * seconds) for stage, seconds in ai.startup_times.items())
+          + " (total {:.2f}ms)".format(1000 * sum(ai.startup_times.values())))
+    report = HeadlessRunner(ai, patrol_script(args.ticks), render=args.render or bool(args.capture)).run(args.ticks)
+    print("{ticks} ticks in {seconds:.2f}s ({ticks_per_sec:,.0f} ticks/sec), ended by {reason}; "
+          "score {score}, level {level}, ships left {ships_left}".format(**report))
+    print(assets.format_report())
+    print(ai.bullet_pool.format_report('bullet pool'))
+    print(ai.alien_pool.format_report('alien pool'))
+    if ai.capture is not None:
+        ai.capture.close()
+        print(ai.capture.format_report())
+    if args.render or args.capture:
+        print("HUD composed {} times in {} frames".format(ai.sb.hud_rebuilds, ai.sb.hud_frames))
+    print(glyphs.format_report()) # the scoreboard prepares its text as the score changes, whether or not frames are drawn
+    if ai.dirty_renderer is not None and ai.dirty_renderer.frames:
+        print("dirty rendering: {} of {} frames repainted the whole screen".format(ai.dirty_renderer.full_frames,
+                                                                                   ai.dirty_renderer.frames))
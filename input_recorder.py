@@ -0,0 +1,77 @@
+'''Record every input action of a game session, tagged with its simulation tick, to a compact binary file.
+
+A recording starts with a header (screen size, simulation rate, hash interval) and a settings block (its length as a
+varint, then the settings in RECORDED_SETTINGS as JSON), followed by records. Every record is one type byte and the number
+of ticks since the previous record as a varint; state records also carry a 4-byte hash. An action record's type is the
+action, with RIVAL_RECORD set for the second player's. replay.py reads the file back.'''
+
+import json
+import struct
+
+MAGIC = b'AIRP'
+VERSION = 2
+HEADER = struct.Struct('<4sBIIHH') # magic, version, screen width, screen height, sim rate, hash interval
+# The settings that change what happens in the game, so a replay has to use the same values. The speeds and points
+# aren't here, because starting a game resets them.
+RECORDED_SETTINGS = ('bg_color', 'ship_limit', 'ship_hit_pause', 'level_pause', 'bullet_width', 'bullet_height',
+                     'bullets_allowed', 'fleet_drop_speed', 'fleet_backend', 'collision_broadphase', 'precise_collisions',
+                     'two_player', 'speedup_scale', 'score_scale')
+STATE_RECORD = 0x80 # followed by the state hash
+RIVAL_RECORD = 0x40 # set in the type of the second player's actions
+END_RECORD = 0xFF # the session ended at this tick
+
+class InputRecorder:
+    '''A class that writes every input action, tagged with the simulation tick it happened on, to a file.'''
+
+    def __init__(self, path, screen_size, settings):
+        '''Open the file and write the header.'''
+        self.file = open(path, 'wb')
+        self.hash_interval = settings.replay_hash_interval
+        self.last_tick = 0
+        self.file.write(HEADER.pack(MAGIC, VERSION, screen_size[0], screen_size[1], settings.sim_rate, self.hash_interval))
+        block = json.dumps({name: getattr(settings, name) for name in RECORDED_SETTINGS}, separators=(',', ':')).encode()
+        self.file.write(write_varint(len(block)) + block)
+
+    def _write(self, record_type, tick, payload=b''):
+        '''Write one record.'''
+        self.file.write(bytes([record_type]) + write_varint(tick - self.last_tick) + payload)
+        self.last_tick = tick
+
+    def record(self, tick, action, rival=False):
+        '''Write an input action; rival marks it as the second player's.'''
+        self._write(int(action) | RIVAL_RECORD if rival else int(action), tick)
+
+    def record_state(self, tick, state_hash):
+        '''Write the game's state hash so a replay can check it got the same result.'''
+        self._write(STATE_RECORD, tick, struct.pack('<I', state_hash))
+
+    def close(self, tick):
+        '''Mark the end of the session and close the file.'''
+        if not self.file.closed:
+            self._write(END_RECORD, tick)
+            self.file.close()
+
+def apply_settings(settings, recorded):
+    '''Set the values from a recording's settings block on settings; JSON has no tuples, so lists are turned back into them.'''
+    for name, value in recorded.items():
+        setattr(settings, name, tuple(value) if isinstance(value, list) else value)
+
+def write_varint(value):
+    '''Encode a non-negative int in as few bytes as possible, seven bits at a time.'''
+    out = bytearray()
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+def read_varint(data, position):
+    '''Decode a varint starting at position; return the value and the position after it.'''
+    value = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
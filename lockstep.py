@@ -0,0 +1,390 @@
+'''Play a two-player game across two processes by running both games in lockstep.
+
+Only input crosses the network. Every tick, each game sends the actions its own player performed, tagged with the tick
+they take effect on, and runs a tick only once it has both players' actions for it. Both games start from the same state
+and apply the same actions on the same ticks, so they stay identical without ever sending sprite positions.
+
+Actions take effect a few ticks after they happen (the input delay) so they normally reach the other game before it
+needs them; when they haven't arrived yet the game waits, and that wait is counted as a stall. Every so often both games
+send a hash of their state, and a mismatch is reported as a desync.
+
+Messages are a type byte followed by:
+    HELLO  screen width, screen height, sim rate, input delay, hash interval (sent by the host; the guest adopts them)
+    INPUT  tick, number of actions, one byte per action
+    HASH   tick, state hash
+    BYE    nothing; the game that sends it has stopped
+
+    python lockstep.py host                              # wait for the other player on port 50007, then play
+    python lockstep.py join 127.0.0.1                    # join a game hosted on this machine
+    python lockstep.py host --record session.airp        # also record both players' input for replay.py
+    python lockstep.py host --headless --ticks 3000 &    # or let two scripted players play each other headlessly
+    python lockstep.py join 127.0.0.1 --headless --ticks 3000 --lag 30'''
+
+import argparse
+import select
+import socket
+import struct
+from collections import deque
+from time import perf_counter, sleep
+
+import pygame
+
+from alien_invasion import AlienInvasion
+from actions import Action
+from settings import Settings
+from headless import patrol_script, parse_size
+from frame_profiler import percentile
+
+HELLO = struct.Struct('<BIIHBH')
+INPUT = struct.Struct('<BIB')
+HASH = struct.Struct('<BII')
+BYE = struct.Struct('<B')
+HELLO_MESSAGE, INPUT_MESSAGE, HASH_MESSAGE, BYE_MESSAGE = range(4)
+
+DEFAULT_PORT = 50007
+
+class LockstepSession:
+    '''A class that runs a game in step with another game over a socket.
+
+    The host's player flies the usual ship and the guest's player flies the second ship; both games apply the host's
+    actions first on every tick, so the order never differs between them.'''
+
+    def __init__(self, ai_game, connection, player, lag=0.0):
+        '''Take over the game's input; player is 0 on the host and 1 on the guest.'''
+        self.ai_game = ai_game
+        self.settings = ai_game.settings
+        self.connection = connection
+        self.player = player
+        self.lag = lag # seconds every outgoing message is held back, to try the game on a slow network
+        self.delay = self.settings.lockstep_input_delay
+        ai_game.lockstep = self
+
+        self.tick = 0 # the next lockstep tick to run; unlike ai_game.tick it also counts ticks on the Play screen
+        self.pending = [] # (action, time) pairs performed by this player that haven't been given a tick yet
+        # The first few ticks are before anyone could have done anything, so they start out empty for both players.
+        self.local_inputs = {tick: [] for tick in range(self.delay)}
+        self.remote_inputs = {tick: [] for tick in range(self.delay)}
+        self.local_hashes = {}
+        self.remote_hashes = {}
+        self.received = bytearray() # bytes read from the socket that don't make up a whole message yet
+        self.outbox = deque() # (send time, message) pairs held back by the lag
+        self.remote_stopped = False
+        self.stopped = False
+
+        # Metrics.
+        self.start = perf_counter()
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.stalls = 0 # ticks that were due before the other player's actions for them had arrived
+        self.stalled_tick = None # the last tick counted as a stall, so waiting on one tick counts once
+        self.stalled = 0.0 # seconds spent waiting for them
+        self.hash_checks = 0
+        self.desyncs = 0
+        self.first_desync = None
+        self.latencies = deque(maxlen=self.settings.profiler_samples) # seconds from an action to the tick it takes effect
+        self.margins = deque(maxlen=self.settings.profiler_samples) # how many ticks early the other player's actions came
+
+    def submit(self, action):
+        '''Queue an action of this player's for the next tick that gets scheduled; quitting stops the session.'''
+        if action == Action.QUIT:
+            self.stop()
+            print(self.format_report())
+            self.ai_game._carry_out(action)
+            return
+        self.pending.append((action, perf_counter()))
+
+    def run(self, max_ticks=None, script=None, render=True, paced=True):
+        '''Run ticks as they fall due (or as fast as the other game allows when not paced) until either player quits,
+        or until max_ticks have run; script maps a tick to the actions this player performs on it.'''
+        ai_game = self.ai_game
+        settings = self.settings
+        dt = ai_game.clock.dt
+        frame_time = 1 / settings.max_fps if settings.max_fps else 0.0
+        next_tick = next_frame = perf_counter()
+        while not self.stopped:
+            if script is None:
+                ai_game._check_events() # turns events into actions, which submit() queues
+            self._receive()
+
+            now = perf_counter()
+            steps = 0
+            while (next_tick <= now or not paced) and steps < settings.max_steps_per_frame:
+                if max_ticks is not None and self.tick >= max_ticks:
+                    self.stop()
+                    return
+                self._schedule(script) # sent before waiting, so the other game is never waiting on us at the same time
+                if self.tick not in self.remote_inputs:
+                    if self.remote_stopped:
+                        self.stop() # the other game has gone and won't send anything else
+                        return
+                    if self.stalled_tick != self.tick:
+                        self.stalled_tick = self.tick
+                        self.stalls += 1
+                    self._wait_for_remote()
+                    break
+                self._advance(dt)
+                next_tick += dt
+                steps += 1
+            if paced and next_tick < now - settings.max_steps_per_frame * dt:
+                next_tick = now # too far behind to catch up; drop the backlog like GameClock does
+            self._flush()
+
+            if render and perf_counter() >= next_frame:
+                ai_game._update_screen()
+                next_frame = max(next_frame + frame_time, perf_counter())
+            if paced:
+                self._sleep_until(min(next_tick, next_frame) if render else next_tick)
+
+    def _schedule(self, script):
+        '''Give this player's waiting actions (and the script's, if there is one) the tick input delay ticks from now,
+        and send them to the other game; does nothing if that tick already has its actions.'''
+        scheduled = self.tick + self.delay
+        if scheduled in self.local_inputs:
+            return
+        if script is not None:
+            for action in script.get(self.tick, ()):
+                self.submit(action)
+        self.local_inputs[scheduled] = self.pending
+        self.pending = []
+        self._send(INPUT.pack(INPUT_MESSAGE, scheduled, len(self.local_inputs[scheduled]))
+                   + bytes(int(action) for action, _ in self.local_inputs[scheduled]))
+
+    def _advance(self, dt):
+        '''Run one tick with both players' actions for it.'''
+        tick = self.tick
+
+        # Apply the host's actions first, then the guest's, in the same order in both games.
+        now = perf_counter()
+        local = self.local_inputs.pop(tick)
+        remote = self.remote_inputs.pop(tick)
+        for action, performed in local:
+            self.latencies.append(now - performed)
+        local_actions = [action for action, _ in local]
+        host_actions, guest_actions = (local_actions, remote) if self.player == 0 else (remote, local_actions)
+        ai_game = self.ai_game
+        for action in host_actions:
+            ai_game._carry_out(action)
+        for action in guest_actions:
+            ai_game.rival.carry_out(action)
+
+        if ai_game.stats.game_active:
+            ai_game._step(dt)
+        self.tick += 1
+
+        if self.tick % self.settings.lockstep_hash_interval == 0:
+            state_hash = ai_game.state_hash()
+            self.local_hashes[self.tick] = state_hash
+            self._send(HASH.pack(HASH_MESSAGE, self.tick, state_hash))
+            self._check_hash(self.tick)
+
+    def _check_hash(self, tick):
+        '''Compare the two games' hashes for tick once both have arrived.'''
+        if tick not in self.local_hashes or tick not in self.remote_hashes:
+            return
+        self.hash_checks += 1
+        if self.local_hashes.pop(tick) != self.remote_hashes.pop(tick):
+            self.desyncs += 1
+            if self.first_desync is None:
+                self.first_desync = tick
+                print("lockstep: the games no longer match at tick {}".format(tick))
+
+    def _send(self, message):
+        '''Send message now, or once the lag has passed.'''
+        self.outbox.append((perf_counter() + self.lag, message))
+
+    def _flush(self):
+        '''Send every held-back message whose time has come.'''
+        now = perf_counter()
+        ready = []
+        while self.outbox and self.outbox[0][0] <= now:
+            ready.append(self.outbox.popleft()[1])
+        if ready:
+            data = b''.join(ready) # one write for everything that's due keeps the packets down
+            self.connection.sendall(data)
+            self.bytes_sent += len(data)
+
+    def _receive(self, timeout=0.0):
+        '''Read whatever has arrived, waiting up to timeout seconds for something to, and handle every whole message.'''
+        readable, _, _ = select.select([self.connection], [], [], timeout)
+        if not readable:
+            return
+        data = self.connection.recv(65536)
+        if not data:
+            self.remote_stopped = True # the connection was closed without a goodbye
+            return
+        self.bytes_received += len(data)
+        self.received += data
+
+        received = self.received
+        position = 0
+        while position < len(received):
+            message_type = received[position]
+            if message_type == INPUT_MESSAGE:
+                if len(received) - position < INPUT.size:
+                    break
+                _, tick, count = INPUT.unpack_from(received, position)
+                end = position + INPUT.size + count
+                if len(received) < end:
+                    break
+                self.remote_inputs[tick] = [Action(action) for action in received[position + INPUT.size:end]]
+                self.margins.append(tick - self.tick)
+                position = end
+            elif message_type == HASH_MESSAGE:
+                if len(received) - position < HASH.size:
+                    break
+                _, tick, state_hash = HASH.unpack_from(received, position)
+                self.remote_hashes[tick] = state_hash
+                self._check_hash(tick)
+                position += HASH.size
+            elif message_type == BYE_MESSAGE:
+                self.remote_stopped = True
+                position += BYE.size
+            else:
+                raise ValueError("unexpected lockstep message type {}".format(message_type))
+        del received[:position]
+
+    def _wait_for_remote(self):
+        '''Wait a little for the other player's actions, flushing ours so the two games can't wait on each other.'''
+        start = perf_counter()
+        self._flush()
+        timeout = 0.002
+        if self.outbox:
+            timeout = min(timeout, max(0.0, self.outbox[0][0] - start)) # don't hold our own messages back any longer
+        self._receive(timeout)
+        self.stalled += perf_counter() - start
+
+    def _sleep_until(self, when):
+        '''Sleep until when, waking early if a message arrives or a held-back one is due.'''
+        timeout = when - perf_counter()
+        if self.outbox:
+            timeout = min(timeout, self.outbox[0][0] - perf_counter())
+        if timeout > 0:
+            self._receive(timeout)
+
+    def stop(self):
+        '''Tell the other game we're going, send anything still held back and close the connection once it has gone too.'''
+        if self.stopped:
+            return
+        self.stopped = True
+        self._send(BYE.pack(BYE_MESSAGE))
+        deadline = perf_counter() + max(1.0, 2 * self.lag)
+        while (self.outbox or not self.remote_stopped) and perf_counter() < deadline:
+            self._flush()
+            if self.outbox:
+                sleep(max(0.0, min(self.outbox[0][0] - perf_counter(), 0.01)))
+            else:
+                self._receive(timeout=0.05) # closing with its messages unread could reset the connection on it
+        self.elapsed = perf_counter() - self.start
+        self.connection.close()
+
+    def report(self):
+        '''Return the bandwidth, latency, stall and hash-check metrics.'''
+        elapsed = getattr(self, 'elapsed', perf_counter() - self.start)
+        latencies = sorted(self.latencies)
+        margins = sorted(self.margins)
+        stats = self.ai_game.stats
+        return {
+            'ticks': self.tick,
+            'seconds': elapsed,
+            'sent_kb': self.bytes_sent / 1024,
+            'received_kb': self.bytes_received / 1024,
+            'sent_bytes_per_sec': self.bytes_sent / elapsed if elapsed > 0 else 0.0,
+            'received_bytes_per_sec': self.bytes_received / elapsed if elapsed > 0 else 0.0,
+            'latency_p50_ms': 1000 * percentile(latencies, 50),
+            'latency_p99_ms': 1000 * percentile(latencies, 99),
+            'margin_p50_ticks': percentile(margins, 50),
+            'margin_min_ticks': margins[0] if margins else 0,
+            'stalls': self.stalls,
+            'stalled_ms': 1000 * self.stalled,
+            'hash_checks': self.hash_checks,
+            'desyncs': self.desyncs,
+            'state_hash': self.ai_game.state_hash(),
+            'scores': (stats.score, stats.rival_score),
+        }
+
+    def format_report(self):
+        '''Return report() as a few lines of text.'''
+        return ("lockstep: {ticks} ticks in {seconds:.2f}s; sent {sent_kb:.1f}KB ({sent_bytes_per_sec:.0f} B/s), "
+                "received {received_kb:.1f}KB ({received_bytes_per_sec:.0f} B/s)\n"
+                "input latency p50 {latency_p50_ms:.1f}ms p99 {latency_p99_ms:.1f}ms; other player's input arrived "
+                "{margin_p50_ticks} ticks early (p50), {margin_min_ticks} at worst; {stalls} stalls ({stalled_ms:.0f}ms)\n"
+                "{hash_checks} hash checks, {desyncs} desyncs; final state {state_hash:08x}, "
+                "scores P1 {scores[0]:,} P2 {scores[1]:,}".format(**self.report()))
+
+def host(port, settings):
+    '''Wait for a guest on port, send it the game settings and return the connection.'''
+    with socket.create_server(('', port)) as server:
+        print("waiting for the other player on port {}".format(port))
+        connection, address = server.accept()
+    connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1) # every message is tiny and wanted now
+    connection.sendall(HELLO.pack(HELLO_MESSAGE, settings.screen_width, settings.screen_height, settings.sim_rate,
+                                  settings.lockstep_input_delay, settings.lockstep_hash_interval))
+    return connection
+
+def join(address, port, settings, timeout=10.0):
+    '''Connect to a host, trying again until timeout runs out, and adopt the settings it sends.'''
+    deadline = perf_counter() + timeout
+    while True:
+        try:
+            connection = socket.create_connection((address, port))
+            break
+        except ConnectionRefusedError:
+            if perf_counter() > deadline:
+                raise
+            sleep(0.1) # the host may not be listening yet
+    connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    hello = bytearray()
+    while len(hello) < HELLO.size:
+        data = connection.recv(HELLO.size - len(hello))
+        if not data:
+            raise ConnectionError("the host closed the connection before the game started")
+        hello += data
+    (message_type, settings.screen_width, settings.screen_height, settings.sim_rate, settings.lockstep_input_delay,
+     settings.lockstep_hash_interval) = HELLO.unpack(hello)
+    if message_type != HELLO_MESSAGE:
+        raise ConnectionError("the host didn't start with a hello")
+    return connection
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Play Alien Invasion against another player in lockstep.')
+    parser.add_argument('role', choices=('host', 'join'), help='host a game or join one')
+    parser.add_argument('address', nargs='?', default='127.0.0.1', help='the host to join')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='the port the host listens on')
+    parser.add_argument('--size', type=parse_size, help='screen size chosen by the host, e.g. 1200x800')
+    parser.add_argument('--delay', type=int, help='input delay in ticks, chosen by the host')
+    parser.add_argument('--lag', type=float, default=0.0, help='milliseconds to hold back every message we send')
+    parser.add_argument('--headless', action='store_true', help='play with a scripted player and no window')
+    parser.add_argument('--ticks', type=int, default=3000, help='how many ticks a headless game lasts')
+    parser.add_argument('--render', action='store_true', help='draw frames in a headless game too')
+    parser.add_argument('--fast', action='store_true', help="in a headless game, run ticks as fast as the two games can")
+    parser.add_argument('--record', help="record both players' input to this file for replay.py")
+    args = parser.parse_args()
+
+    settings = Settings()
+    settings.two_player = True
+    settings.record_path = args.record
+    if args.size:
+        settings.screen_width, settings.screen_height = args.size
+    if args.delay is not None:
+        settings.lockstep_input_delay = args.delay
+    player = 0 if args.role == 'host' else 1
+    if player == 0:
+        screen_size = (settings.screen_width, settings.screen_height) if args.size or args.headless else None
+        ai = AlienInvasion(headless=args.headless, screen_size=screen_size, settings=settings)
+        connection = host(args.port, settings) # the size is only known once the window is open
+    else:
+        connection = join(args.address, args.port, settings)
+        ai = AlienInvasion(headless=args.headless, screen_size=(settings.screen_width, settings.screen_height),
+                           settings=settings)
+    session = LockstepSession(ai, connection, player, lag=args.lag / 1000)
+
+    if args.headless:
+        # The two scripted players fire at different rates and turn at different times, so their ships split up.
+        script = patrol_script(args.ticks, fire_every=10 + 3 * player, turn_every=400 + 150 * player, start=player == 0)
+        session.run(args.ticks, script=script, render=args.render, paced=not args.fast)
+    else:
+        session.run() # returns when the other player leaves; leaving ourselves exits the game
+    print(session.format_report())
+    if ai.recorder is not None:
+        ai.recorder.close(ai.tick)
+    pygame.quit()
@@ -0,0 +1,85 @@
+'''Measure how many bytes each alien and bullet costs with tracemalloc, at fleet sizes from 50 to 50,000.
+
+    python memory_report.py                          # print bytes per sprite at every size
+    python memory_report.py --output before.json     # also keep the numbers
+    python memory_report.py --compare before.json    # show the change against numbers kept earlier'''
+
+import argparse
+import gc
+import json
+import tracemalloc
+
+from alien_invasion import AlienInvasion
+from alien import Alien
+from bullet import Bullet
+from settings import Settings
+from headless import parse_override
+
+SIZES = (50, 500, 5000, 50000)
+
+def _measure(build):
+    '''Return how many bytes the objects made by build() hold on to, not counting anything freed along the way.'''
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build() # keep a reference so nothing is freed before the second reading
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return after - before
+
+def _build_fleet(ai_game, count):
+    '''Return a fleet holding count aliens laid out in a grid, the way the game lays them out.'''
+    fleet = ai_game._make_fleet()
+    per_row = max(1, ai_game._fleet_layout()[0]) # as many to a row as the game puts there; the rows carry on past the screen
+    for number in range(count):
+        alien = Alien(ai_game)
+        alien.x = alien.rect.width + 2 * alien.rect.width * (number % per_row)
+        alien.rect.x = alien.x
+        alien.rect.y = alien.rect.height + 2 * alien.rect.height * (number // per_row)
+        fleet.add(alien)
+    return fleet
+
+def run_report(ai_game, sizes=SIZES):
+    '''Return {kind: {size: bytes per sprite}} for lone aliens, lone bullets and aliens in a fleet.'''
+    builders = {
+        'alien': lambda count: [Alien(ai_game) for _ in range(count)],
+        'bullet': lambda count: [Bullet(ai_game) for _ in range(count)],
+        'fleet_alien': lambda count: _build_fleet(ai_game, count), # includes the group, index and bounds bookkeeping
+    }
+    report = {}
+    for kind, build in builders.items():
+        report[kind] = {str(size): _measure(lambda: build(size)) / size for size in sizes}
+    return report
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Report the memory cost of each Alien Invasion sprite.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='numbers of sprites to measure')
+    parser.add_argument('--set', dest='overrides', action='append', type=parse_override, default=[],
+                        help='override a setting, e.g. --set fleet_backend=numpy')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='a JSON file written earlier with --output to compare against')
+    args = parser.parse_args()
+
+    settings = Settings()
+    for name, value in args.overrides:
+        setattr(settings, name, value)
+    ai = AlienInvasion(headless=True, screen_size=(1200, 800), settings=settings)
+    report = run_report(ai, args.sizes)
+
+    previous = {}
+    if args.compare:
+        with open(args.compare) as file_object:
+            previous = json.load(file_object)
+
+    for kind, sizes in report.items():
+        for size, per_sprite in sizes.items():
+            line = "{:<12} {:>7,} sprites  {:>7.1f} bytes each".format(kind, int(size), per_sprite)
+            before = previous.get(kind, {}).get(size)
+            if before:
+                line += "  (was {:.1f}, {:+.1%})".format(before, per_sprite / before - 1)
+            print(line)
+
+    if args.output:
+        with open(args.output, 'w') as file_object:
+            json.dump(report, file_object, indent=2)
@@ -0,0 +1,261 @@
+'''Run the game logic and the drawing on separate threads, so a slow display.flip() doesn't hold up the simulation and
+a slow simulation step doesn't hold up input and drawing.
+
+Who owns what:
+  - The simulation thread owns the game state: the ship, bullets, aliens, stats, settings and the recorder. It applies
+    input actions from a queue, runs the fixed steps that are due and publishes a Snapshot after each batch.
+  - The main thread owns everything pygame draws with: the screen, the display, the event queue, the mouse, the real
+    Scoreboard and the Play button. It turns events into actions and draws the newest snapshot.
+  - Snapshots are immutable, so once one is published both threads can read it without locking.
+No Surface is drawn on or changed by the simulation thread; it only passes the shared images around by reference.'''
+
+import queue
+import threading
+from collections import deque
+from time import perf_counter
+
+import pygame
+
+from asset_cache import assets
+from actions import Action
+from frame_profiler import percentile
+
+class Snapshot:
+    '''An immutable picture of everything the main thread needs to draw one frame.'''
+
+    __slots__ = ('tick', 'published', 'ship', 'bullets', 'aliens', 'score', 'high_score', 'level', 'ships_left',
+                 'game_active', 'rival_ship', 'rival_bullets', 'rival_score')
+
+    def __init__(self, ai_game):
+        '''Copy the positions and scoreboard values out of the game; call only on the thread that owns the game.'''
+        stats = ai_game.stats
+        set_value = object.__setattr__ # __setattr__ below refuses writes, so fill the slots directly
+        set_value(self, 'tick', ai_game.tick)
+        set_value(self, 'ship', ai_game.ship.rect.topleft)
+        set_value(self, 'bullets', tuple(bullet.rect.topleft for bullet in ai_game.bullets.sprites()))
+        set_value(self, 'aliens', tuple(ai_game.aliens.positions()))
+        set_value(self, 'score', stats.score)
+        set_value(self, 'high_score', stats.high_score)
+        set_value(self, 'level', stats.level)
+        set_value(self, 'ships_left', stats.ships_left)
+        set_value(self, 'game_active', stats.game_active)
+        set_value(self, 'rival_score', stats.rival_score)
+        rival = ai_game.rival # the second player's ship and bullets, in a two-player game
+        if rival is not None:
+            set_value(self, 'rival_ship', rival.ship.rect.topleft)
+            set_value(self, 'rival_bullets', tuple(bullet.rect.topleft for bullet in rival.bullets.sprites()))
+        else:
+            set_value(self, 'rival_ship', None)
+            set_value(self, 'rival_bullets', ())
+        set_value(self, 'published', perf_counter())
+
+    def __setattr__(self, name, value):
+        raise AttributeError("snapshots can't be changed once they are made")
+
+class SnapshotBuffer:
+    '''A double buffer of snapshots: the simulation thread builds the next one (the back buffer) while the main thread
+    draws the newest published one (the front buffer), and publishing swaps them under a lock.'''
+
+    def __init__(self, snapshot):
+        '''Start with snapshot in front.'''
+        self.lock = threading.Lock()
+        self.front = snapshot
+        self.taken = False # whether the main thread has picked up the front snapshot yet
+        self.published = 1
+        self.dropped = 0 # snapshots replaced before the main thread ever drew them
+
+    def publish(self, snapshot):
+        '''Make snapshot the newest one.'''
+        with self.lock:
+            if not self.taken:
+                self.dropped += 1
+            self.front = snapshot
+            self.taken = False
+            self.published += 1
+
+    def take(self):
+        '''Return the newest snapshot and whether it is new since the last call.'''
+        with self.lock:
+            fresh = not self.taken
+            self.taken = True
+            return self.front, fresh
+
+class _SimScoreboard:
+    '''Stands in for the Scoreboard on the simulation thread: it keeps the high score but renders nothing.'''
+
+    def __init__(self, stats):
+        '''Initialize with the game's stats.'''
+        self.stats = stats
+
+    def prep_score(self):
+        '''The main thread renders the score from the snapshots.'''
+
+    prep_high_score = prep_level = prep_ships = prep_rival_score = prep_score
+
+    def check_high_score(self):
+        '''Raise the high score to the score if it's been beaten, like Scoreboard.check_high_score().'''
+        best_score = max(self.stats.score, self.stats.rival_score)
+        if best_score > self.stats.high_score:
+            self.stats.high_score = best_score
+
+# Put on the action queue to stop the simulation thread.
+_STOP = object()
+
+class Pipeline:
+    '''A class that runs the simulation on its own thread and draws its snapshots on the main thread.'''
+
+    def __init__(self, ai_game):
+        '''Take over the game's scoreboard and set up the thread, the action queue and the snapshot buffer.'''
+        self.ai_game = ai_game
+        self.settings = ai_game.settings
+        self.screen = ai_game.screen
+
+        # The real scoreboard is drawn on the main thread from snapshot values; the game logic gets a stand-in.
+        self.scoreboard = ai_game.sb
+        ai_game.sb = _SimScoreboard(ai_game.stats)
+
+        # Make every image the simulation thread will hand around now, on the main thread.
+        self.ship_image = ai_game.ship.image
+        self.alien_image = assets.load_image(ai_game.alien_pool.factory.IMAGE)
+        self.bullet_image = assets.solid_surface((self.settings.bullet_width, self.settings.bullet_height),
+                                                 self.settings.bullet_color)
+        if self.settings.precise_collisions:
+            # The collision masks too, so the simulation thread finds them in the cache instead of building them mid-step.
+            for image in (self.ship_image, self.alien_image, self.bullet_image):
+                assets.load_mask(image, self.settings.bg_color)
+
+        self.actions = queue.SimpleQueue() # input actions waiting for the simulation thread
+        self.buffer = SnapshotBuffer(Snapshot(ai_game))
+        self.thread = threading.Thread(target=self._simulate, name='simulation', daemon=True)
+        self.mouse_visible = None
+
+        # Metrics.
+        self.frames = 0
+        self.repeated = 0 # frames drawn without a new snapshot to show
+        self.latencies = deque(maxlen=self.settings.profiler_samples) # seconds from publishing a snapshot to showing it
+
+    def run(self):
+        '''Start the simulation thread and draw frames on this thread until the player quits.'''
+        ai_game = self.ai_game
+        clock = pygame.time.Clock()
+        self.thread.start()
+        active = False
+        while True:
+            ai_game._check_events() # turns events into actions, which submit() passes on
+            clock.tick(self.settings.max_fps if active else self.settings.idle_fps)
+            active = self._draw()
+
+    def submit(self, action):
+        '''Hand an input action to the simulation thread; quitting is handled here, once the thread has stopped.'''
+        if action == Action.QUIT:
+            self.stop()
+            print(self.format_report())
+            self.ai_game._carry_out(action)
+            return
+        self.actions.put(action)
+
+    def stop(self):
+        '''Stop the simulation thread and wait for it, after which this thread may touch the game state again.'''
+        if self.thread.is_alive():
+            self.actions.put(_STOP)
+            self.thread.join()
+
+    def _simulate(self):
+        '''The simulation thread: apply actions as they arrive, run the steps that are due and publish snapshots.'''
+        ai_game = self.ai_game
+        settings = self.settings
+        dt = ai_game.clock.dt
+        next_step = perf_counter()
+        while True:
+            # Sleep until the next step is due, waking early for input; on the Play screen nothing moves, so just wait.
+            timeout = max(0.0, next_step - perf_counter()) if ai_game.stats.game_active else None
+            try:
+                action = self.actions.get(timeout=timeout)
+            except queue.Empty:
+                action = None
+
+            if action is _STOP:
+                return
+            if action is not None:
+                was_active = ai_game.stats.game_active
+                ai_game._carry_out(action)
+                if not was_active:
+                    next_step = perf_counter() # time spent on the Play screen isn't made up for
+                self.buffer.publish(Snapshot(ai_game))
+                continue
+
+            # Run every step that is due, dropping the backlog if we fall too far behind (like GameClock).
+            now = perf_counter()
+            steps = 0
+            while next_step <= now and ai_game.stats.game_active:
+                ai_game._step(dt)
+                next_step += dt
+                steps += 1
+                if steps == settings.max_steps_per_frame:
+                    next_step = max(next_step, now)
+                    break
+            if steps:
+                self.buffer.publish(Snapshot(ai_game))
+
+    def _draw(self):
+        '''Draw the newest snapshot and return whether the game in it is active.'''
+        snapshot, fresh = self.buffer.take()
+        screen = self.screen
+        self._sync_hud(snapshot)
+
+        screen.fill(self.settings.bg_color)
+        sprites = [(self.ship_image, snapshot.ship)]
+        bullet_image = self.bullet_image
+        sprites.extend((bullet_image, position) for position in snapshot.bullets)
+        if snapshot.rival_ship is not None: # drawn in the same order as the other render modes draw it
+            sprites.append((self.ship_image, snapshot.rival_ship))
+            sprites.extend((bullet_image, position) for position in snapshot.rival_bullets)
+        alien_image = self.alien_image
+        sprites.extend((alien_image, position) for position in snapshot.aliens)
+        screen.blits(sprites, doreturn=False)
+        screen.blits(self.scoreboard.hud_blits(), doreturn=False)
+        if not snapshot.game_active:
+            self.ai_game.play_button.draw_button()
+        pygame.display.flip()
+        if self.ai_game.capture is not None:
+            self.ai_game.capture.grab(snapshot.tick)
+
+        self.frames += 1
+        if fresh:
+            self.latencies.append(perf_counter() - snapshot.published)
+        else:
+            self.repeated += 1
+        return snapshot.game_active
+
+    def _sync_hud(self, snapshot):
+        '''Bring the scoreboard images and the mouse cursor up to date with snapshot.'''
+        scoreboard = self.scoreboard
+        scoreboard.stats = snapshot # snapshots have every stat the scoreboard reads
+        scoreboard.prep_score() # each of these only does anything when its value has changed
+        scoreboard.prep_high_score()
+        scoreboard.prep_level()
+        scoreboard.prep_ships()
+        scoreboard.prep_rival_score() # only in a two-player game
+
+        # The cursor is hidden while playing; the game logic leaves it to us in this mode.
+        if self.mouse_visible is None or self.mouse_visible == snapshot.game_active:
+            self.mouse_visible = not snapshot.game_active
+            pygame.mouse.set_visible(self.mouse_visible)
+
+    def report(self):
+        '''Return the snapshot latency and dropped-frame metrics.'''
+        latencies = sorted(self.latencies)
+        return {
+            'frames': self.frames,
+            'snapshots': self.buffer.published,
+            'dropped': self.buffer.dropped,
+            'repeated': self.repeated,
+            'hud_rebuilds': self.scoreboard.hud_rebuilds,
+            'latency_p50_ms': 1000 * percentile(latencies, 50),
+            'latency_p99_ms': 1000 * percentile(latencies, 99),
+        }
+
+    def format_report(self):
+        '''Return report() as one line of text.'''
+        return ("pipeline: {frames} frames, {snapshots} snapshots ({dropped} never drawn), {repeated} frames repeated, "
+                "HUD composed {hud_rebuilds} times, latency p50 {latency_p50_ms:.2f}ms p99 {latency_p99_ms:.2f}ms".format(**self.report()))
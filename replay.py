@@ -0,0 +1,128 @@
+'''Replay a recorded game session deterministically and check it against the recorded state hashes.
+
+The file format is described in input_recorder.py.
+
+    python replay.py session.airp                 # re-simulate as fast as possible and check the state hashes
+    python replay.py session.airp --watch --speed 2  # watch the session in a window at double speed'''
+
+import argparse
+import json
+import struct
+import sys
+from time import perf_counter, sleep
+
+import pygame
+
+from alien_invasion import AlienInvasion
+from actions import Action
+from settings import Settings
+from input_recorder import HEADER, MAGIC, VERSION, STATE_RECORD, RIVAL_RECORD, END_RECORD, apply_settings, read_varint
+
+class Recording:
+    '''A class that reads a recording back.'''
+
+    def __init__(self, path):
+        '''Read the whole file.'''
+        with open(path, 'rb') as file_object:
+            data = file_object.read()
+        magic, version, width, height, self.sim_rate, self.hash_interval = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("{} is not an Alien Invasion recording this version can read".format(path))
+        self.screen_size = (width, height)
+        length, position = read_varint(data, HEADER.size)
+        self.settings = json.loads(data[position:position + length]) # the game settings the session was played with
+        position += length
+
+        # Decode the records into (tick, type, hash) tuples.
+        self.records = []
+        tick = 0
+        while position < len(data):
+            record_type = data[position]
+            delta, position = read_varint(data, position + 1)
+            tick += delta
+            state_hash = None
+            if record_type == STATE_RECORD:
+                state_hash = struct.unpack_from('<I', data, position)[0]
+                position += 4
+            self.records.append((tick, record_type, state_hash))
+
+class Replayer:
+    '''A class that re-simulates a recording and checks its state hashes.'''
+
+    def __init__(self, recording, watch=False, speed=None):
+        '''Build a game that matches the recording.'''
+        self.recording = recording
+        self.watch = watch # draw every frame in a window instead of running headless
+        self.speed = speed # None replays as fast as possible; 1.0 is real time, 2.0 double speed and so on
+        settings = Settings()
+        apply_settings(settings, recording.settings)
+        settings.sim_rate = recording.sim_rate
+        settings.replay_hash_interval = recording.hash_interval
+        self.ai_game = AlienInvasion(headless=not watch, screen_size=recording.screen_size, settings=settings)
+        self.mismatches = [] # (tick, recorded hash, replayed hash) for every state check that failed
+        self.checks = 0
+
+    def run(self):
+        '''Replay the whole recording and return a report.'''
+        ai_game = self.ai_game
+        dt = ai_game.clock.dt
+        records = self.recording.records
+        index = 0
+        start = perf_counter()
+
+        while index < len(records):
+            tick, record_type, state_hash = records[index]
+            if tick > ai_game.tick: # nothing more happens on this tick, so simulate it
+                if not ai_game.stats.game_active:
+                    break # the recording says something happens later, but the game can't move on without input
+                ai_game._step(dt)
+                self._pace(start)
+                continue
+
+            index += 1
+            if record_type == STATE_RECORD:
+                self.checks += 1
+                replayed = ai_game.state_hash()
+                if replayed != state_hash:
+                    self.mismatches.append((tick, state_hash, replayed))
+            elif record_type == END_RECORD or record_type == Action.QUIT:
+                break
+            elif record_type & RIVAL_RECORD:
+                ai_game.rival.carry_out(Action(record_type & ~RIVAL_RECORD))
+            else:
+                ai_game._perform(Action(record_type))
+
+        elapsed = perf_counter() - start
+        return {
+            'ticks': ai_game.tick,
+            'seconds': elapsed,
+            'ticks_per_sec': ai_game.tick / elapsed if elapsed > 0 else 0.0,
+            'checks': self.checks,
+            'mismatches': self.mismatches,
+        }
+
+    def _pace(self, start):
+        '''Draw the frame and wait so the replay runs at the chosen speed.'''
+        ai_game = self.ai_game
+        if self.watch:
+            pygame.event.pump() # keep the window responsive
+            ai_game._update_screen()
+        if self.speed:
+            due = start + ai_game.tick * ai_game.clock.dt / self.speed
+            delay = due - perf_counter()
+            if delay > 0:
+                sleep(delay)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay a recorded Alien Invasion session and check it for desyncs.')
+    parser.add_argument('path', help='a file written with Settings.record_path')
+    parser.add_argument('--watch', action='store_true', help='show the replay in a window')
+    parser.add_argument('--speed', type=float, help='playback speed (1.0 is real time); uncapped if left out')
+    args = parser.parse_args()
+
+    report = Replayer(Recording(args.path), watch=args.watch, speed=args.speed).run()
+    print("Replayed {ticks} ticks in {seconds:.2f}s ({ticks_per_sec:,.0f} ticks/sec), {checks} state checks".format(**report))
+    for tick, recorded, replayed in report['mismatches']:
+        print("DESYNC at tick {}: recorded {:08x}, replayed {:08x}".format(tick, recorded, replayed))
+    if report['mismatches']:
+        sys.exit(1)
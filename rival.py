@@ -0,0 +1,75 @@
+from ship import Ship
+from sprite_pool import PooledGroup
+from game_state import GameState
+from actions import Action
+
+class Rival:
+    '''A class to manage the second player's ship, bullets and score in a two-player game.
+
+    Both players share the fleet, the ships left and the level; each keeps their own score. The game calls into the
+    rival at the same points it handles its own ship, so both players follow exactly the same rules.'''
+
+    # The actions that only move or fire the second ship; any other action is the game's to carry out.
+    SHIP_ACTIONS = (Action.MOVE_RIGHT, Action.STOP_RIGHT, Action.MOVE_LEFT, Action.STOP_LEFT, Action.FIRE)
+
+    def __init__(self, ai_game):
+        '''Make the second ship and move both ships to their own side of the center.'''
+        self.ai_game = ai_game
+        self.settings = ai_game.settings
+        self.stats = ai_game.stats
+        self.ship = Ship(ai_game)
+        self.bullets = PooledGroup(ai_game.bullet_pool) # dead bullets go back to the pool the player's bullets use
+
+        # The ships start two ship widths apart so they don't begin on top of each other.
+        ai_game.ship.home_offset = -self.ship.rect.width
+        self.ship.home_offset = self.ship.rect.width
+        ai_game.ship.center_ship()
+        self.ship.center_ship()
+
+    def carry_out(self, action):
+        '''Apply one of the second player's input actions; anything that isn't about their ship goes to the game.'''
+        if action not in self.SHIP_ACTIONS:
+            self.ai_game._carry_out(action) # starting a game works the same whoever asks, and the game records it
+            return
+
+        recorder = self.ai_game.recorder
+        if recorder is not None:
+            recorder.record(self.ai_game.tick, action, rival=True) # so a replay can move the second ship too
+        if action == Action.MOVE_RIGHT:
+            self.ship.moving_right = True
+        elif action == Action.STOP_RIGHT:
+            self.ship.moving_right = False
+        elif action == Action.MOVE_LEFT:
+            self.ship.moving_left = True
+        elif action == Action.STOP_LEFT:
+            self.ship.moving_left = False
+        elif action == Action.FIRE:
+            self._fire_bullet()
+
+    def _fire_bullet(self):
+        '''Fire a bullet from the second ship, with the same limit on bullets as the player.'''
+        if len(self.bullets) < self.settings.bullets_allowed and self.ai_game.state.current == GameState.PLAYING:
+            self.bullets.add(self.ai_game.bullet_pool.acquire(self.ai_game, self.ship))
+
+    def update_bullets(self, dt):
+        '''Move the second player's bullets and get rid of the ones off the top of the screen.'''
+        self.bullets.update(dt)
+        self.bullets.remove_leading(lambda bullet: bullet.rect.bottom <= 0)
+
+    def check_bullet_alien_collision(self):
+        '''Remove bullets and aliens that collide and add the points to the second player's score.'''
+        collisions = self.ai_game.aliens.collide_bullets(self.bullets)
+        if collisions:
+            for aliens in collisions.values():
+                self.stats.rival_score += self.settings.alien_points * len(aliens)
+            self.ai_game.sb.prep_rival_score()
+            self.ai_game.sb.check_high_score()
+
+    def reset(self):
+        '''Clear the second player's bullets and put their ship back at its starting place.'''
+        self.bullets.empty()
+        self.ship.center_ship()
+
+    def hit_by(self, aliens):
+        '''Return True if an alien in aliens has collided with the second ship.'''
+        return aliens.collide_any(self.ship) is not None
@@ -1,14 +1,14 @@
-import pygame.font
-from pygame.sprite import Group
+import pygame
 
 from ship import Ship
+from glyph_cache import glyphs
+from asset_cache import assets, COLORKEY
 
 class Scoreboard:
     '''A class to report scoring information.'''
 
     def __init__(self, ai_game): # ai_game parameter allows access to the settings, screen, and stats objects
         '''Initialize scorekeeping attributes.'''
-        self.ai_game = ai_game # assign the game instance to an attribute because we'll need it to create some ships
         self.screen = ai_game.screen
         self.screen_rect = self.screen.get_rect()
         self.settings = ai_game.settings
@@ -16,19 +16,39 @@ class Scoreboard:
 
         # Font settings for scoring information.
         self.text_color = (30, 30, 30) # set text color
-        self.font = pygame.font.SysFont(None, 48) # instantiate a font object
+        self.font = assets.load_font(None, 48) # the same font object the Play button uses
+
+        # The values currently shown, so an image is only rebuilt when what it displays actually changes.
+        self.shown_score = None
+        self.shown_high_score = None
+        self.shown_level = None
+        self.shown_ships = None
+        self.shown_rival_score = None
+        self.ship_image = assets.load_image(Ship.IMAGE) # the image the player's ship uses, drawn once per ship left
+
+        # Everything above composed into one image, so a frame draws the whole HUD with a single blit. It is thrown away
+        # whenever one of the values changes and composed again the next time it is drawn.
+        self.hud_image = None
+        self.hud_rect = None
+        self.hud_rebuilds = 0 # how many times the HUD image was composed
+        self.hud_frames = 0 # how many frames drew it
 
         # Prepare the initial score image.
         self.prep_score()
         self.prep_high_score() # displayed separate from the score so we need a new method
         self.prep_level()
         self.prep_ships()
+        self.prep_rival_score()
 
     def prep_score(self):
         '''Turn the score into a rendered image.'''
         rounded_score = round(self.stats.score, -1) # the -1 argument in the round() function rounds to the nearest 10
+        if rounded_score == self.shown_score: # the image already shows this value
+            return
+        self.shown_score = rounded_score
+        self.hud_image = None
         score_str = "{:,}".format(rounded_score) # inserts commas into numbers when converting to a string
-        self.score_image = self.font.render(score_str, True, self.text_color, self.settings.bg_color) # creates the image
+        self.score_image = glyphs.render(self.font, score_str, self.text_color, self.settings.bg_color) # builds the image from cached digits
 
         # Display the score at the top right of the screen and expands to the left as the score increases.
         self.score_rect = self.score_image.get_rect()
@@ -38,8 +58,12 @@ class Scoreboard:
     def prep_high_score(self):
         '''Turn the high score into a rendered image.'''
         high_score = round(self.stats.high_score, -1) # round the high score to the nearest 10
+        if high_score == self.shown_high_score:
+            return
+        self.shown_high_score = high_score
+        self.hud_image = None
         high_score_str = "{:,}".format(high_score) # and format with commas
-        self.high_score_image = self.font.render(high_score_str, True, self.text_color, self.settings.bg_color)
+        self.high_score_image = glyphs.render(self.font, high_score_str, self.text_color, self.settings.bg_color)
 
         # Center the high score at the top of the screen.
         self.high_score_rect = self.high_score_image.get_rect()
@@ -48,32 +72,91 @@ class Scoreboard:
 
     def prep_level(self):
         '''Turn the level into a rendered image.'''
+        if self.stats.level == self.shown_level:
+            return
+        self.shown_level = self.stats.level
+        self.hud_image = None
         level_str = str(self.stats.level)
-        self.level_image = self.font.render(level_str, True, self.text_color, self.settings.bg_color) # creates an image from value
+        self.level_image = glyphs.render(self.font, level_str, self.text_color, self.settings.bg_color) # creates an image from value
 
         # Position the level below the score.
         self.level_rect = self.level_image.get_rect()
         self.level_rect.right = self.score_rect.right # sets image right attribute to match the score's right attribute
         self.level_rect.top = self.score_rect.bottom + 10 # sets top attribute 10 pixels beneath the bottom of the score image
 
-    def prep_ships(self): # creates an empty group self.ships to hold the ship instances
+    def prep_ships(self):
         '''Show how many ships are left.'''
-        self.ships = Group() 
-        for ship_number in range(self.stats.ships_left): # to fill the group, a loop runs for every ship the player has left
-            ship = Ship(self.ai_game) # create a new ship
-            ship.rect.x = 10 + ship_number * ship.rect.width # ship will appear next to each other with a 10 pixel margin on left side
-            ship.rect.y = 10 # y value is 10 pixels down from the top of the screen
-            self.ships.add(ship) # add each new ship to the group ships
+        if self.stats.ships_left == self.shown_ships:
+            return
+        self.shown_ships = self.stats.ships_left
+        self.hud_image = None
+        ship_width = self.ship_image.get_width()
+        # ships appear next to each other with a 10 pixel margin on the left side, 10 pixels down from the top of the screen
+        self.ship_rects = [self.ship_image.get_rect(x=10 + ship_number * ship_width, y=10)
+                           for ship_number in range(self.stats.ships_left)]
+
+    def prep_rival_score(self):
+        '''Turn the second player's score into a rendered image, in a two-player game.'''
+        if not self.settings.two_player:
+            return
+        rival_score = round(self.stats.rival_score, -1)
+        if rival_score == self.shown_rival_score:
+            return
+        self.shown_rival_score = rival_score
+        self.hud_image = None
+        self.rival_score_image = glyphs.render(self.font, "P2 {:,}".format(rival_score), self.text_color,
+                                               self.settings.bg_color)
+
+        # Show it on the left, under the ships.
+        self.rival_score_rect = self.rival_score_image.get_rect()
+        self.rival_score_rect.left = 10
+        self.rival_score_rect.top = self.ship_image.get_height() + 20
+
+    def _hud_items(self):
+        '''Return (image, rect) pairs for everything the HUD shows.'''
+        items = [(self.score_image, self.score_rect), (self.high_score_image, self.high_score_rect),
+                 (self.level_image, self.level_rect)]
+        items.extend((self.ship_image, rect) for rect in self.ship_rects)
+        if self.settings.two_player:
+            items.append((self.rival_score_image, self.rival_score_rect))
+        return items
+
+    def _compose_hud(self):
+        '''Draw the score, high score, level and ships into one image covering all of them.'''
+        items = self._hud_items()
+        self.hud_rect = items[0][1].unionall([rect for _, rect in items[1:]])
+        hud_image = pygame.Surface(self.hud_rect.size)
+        if pygame.display.get_surface() is not None:
+            hud_image = hud_image.convert() # composed rarely but blitted every frame, so convert it once here
+        hud_image.fill(COLORKEY)
+        hud_image.set_colorkey(COLORKEY, pygame.RLEACCEL) # the gaps between the items show the game underneath
+        left, top = self.hud_rect.topleft
+        hud_image.blits([(image, rect.move(-left, -top)) for image, rect in items], doreturn=False)
+        self.hud_image = hud_image
+        self.hud_rebuilds += 1
+
+    def _current_hud(self):
+        '''Return the composed HUD image, composing it first if a value has changed since it was last drawn.'''
+        if self.hud_image is None:
+            self._compose_hud()
+        self.hud_frames += 1
+        return self.hud_image
 
     def show_score(self):
-        '''Draw scores and level to the screen.'''
-        self.screen.blit(self.score_image, self.score_rect) # draws score image onscreen at the location score_rect specifies
-        self.screen.blit(self.high_score_image, self.high_score_rect) # draws the high score at the top center of the screen
-        self.screen.blit(self.level_image, self.level_rect) # draws the level image to the screen
-        self.ships.draw(self.screen) # to draw the ships remaining to the screen
+        '''Draw scores, level and ships left to the screen.'''
+        self.screen.blit(self._current_hud(), self.hud_rect) # one blit puts the whole HUD onscreen
+
+    def hud_blits(self):
+        '''Return the (image, rect) pair show_score() draws, ready to hand to Surface.blits().'''
+        return [(self._current_hud(), self.hud_rect)]
+
+    def hud_rects(self):
+        '''Return the rects of the items show_score() draws; the see-through gaps between them never change the screen.'''
+        return [rect.copy() for _, rect in self._hud_items()]
 
     def check_high_score(self): # checks the current score against the high score
         '''Check to see if there's a new high score.'''
-        if self.stats.score > self.stats.high_score: # if the current score is greater,
-            self.stats.high_score = self.stats.score # we update the value of high score
+        best_score = max(self.stats.score, self.stats.rival_score) # in a two-player game either player can beat it
+        if best_score > self.stats.high_score: # if the current score is greater,
+            self.stats.high_score = best_score # we update the value of high score
             self.prep_high_score() # updates the high score's image
\ No newline at end of file
@@ -12,9 +12,20 @@ class Settings:
         self.screen_width = 1200
         self.screen_height = 800
         self.bg_color = (230, 230, 230)
+        self.render_mode = 'full' # 'full' fills and flips the whole screen each frame; 'dirty' repaints only what changed
+        self.batched_blits = False # draw the sprites and the scoreboard with one Surface.blits() call each instead of a call per item
+
+        # Timing settings
+        self.sim_rate = 120 # the game logic always advances in steps of 1/120 of a second, however fast frames are drawn
+        self.max_fps = 60 # frames drawn per second while playing (0 means no cap)
+        self.idle_fps = 15 # frames drawn per second on the Play screen, where nothing moves
+        self.max_steps_per_frame = 8 # a slow frame never runs more than this many steps to catch up
+        self.pipelined = False # run the game logic on its own thread and draw snapshots of it on the main thread
 
         # Ship settings
         self.ship_limit = 3 # the number of ships the player starts with
+        self.ship_hit_pause = 0.5 # seconds of game time everything freezes after the ship is hit
+        self.level_pause = 0.5 # seconds of game time between destroying a fleet and the next one arriving
 
         # Bullet settings
         self.bullet_width = 3 # width of 3 pixels
@@ -24,6 +35,34 @@ class Settings:
 
         # Alien settings
         self.fleet_drop_speed = 10 # controls how quickly the fleet drops down the screen each time an alien reaches either edge
+        self.fleet_backend = 'sprites' # 'sprites' moves aliens one at a time; 'numpy' moves the whole fleet with NumPy arrays
+        self.collision_broadphase = 'spatial_hash' # 'spatial_hash' only tests aliens near each bullet; 'brute' tests every pair
+        self.formation_surface = False # draw the fleet as one pre-composed surface instead of one blit per alien
+        self.precise_collisions = False # after the rect test, also check that the pixels of the two sprites touch
+
+        # Reuse dead bullets and aliens instead of allocating new ones
+        self.sprite_pools = True
+
+        # Profiler settings (press F3 in the game to show the overlay)
+        self.profiler_enabled = False # time every phase of every frame, even with the overlay hidden
+        self.profiler_samples = 600 # how many recent frames the profiler remembers
+        self.profiler_overlay_interval = 15 # the overlay text is refreshed every this many frames
+        self.profiler_export = None # a .csv or .json path the samples are written to when the game quits
+
+        # Recording settings
+        self.record_path = None # when set, every input action is recorded to this file for replay.py
+        self.replay_hash_interval = 60 # a hash of the game state is recorded every this many ticks
+
+        # Frame capture settings (capture_convert.py turns a capture into images)
+        self.capture_path = None # when set, every presented frame is written to this file
+        self.capture_ring_size = 8 # frames that can wait for the writer before new ones are dropped
+        self.capture_compression = 1 # zlib level for each frame; 0 writes raw screen memory
+        self.capture_file_mb = 1024 # the file is made this big up front; frames that don't fit are dropped
+
+        # Two-player settings (lockstep.py connects the two games)
+        self.two_player = False # add a second ship, with its own bullets and score, that shares the fleet and the ships left
+        self.lockstep_input_delay = 6 # input takes effect this many ticks after it happens, so it has time to reach the other game
+        self.lockstep_hash_interval = 60 # the two games compare state hashes every this many ticks
 
         # How quickly the game speeds up
         self.speedup_scale = 1.1 # value of 2 doubles the speed, a value of 1 keeps the speed constant
@@ -36,11 +75,11 @@ class Settings:
 
     def initialize_dynamic_settings(self):
         '''Initialize settings that change throughout the game.'''
-        # sets the initial values for the ship, bullet, and alien speeds
-        self.ship_speed = 1.5 # position is adjusted by 1.5 pixels each pass through the loop
+        # sets the initial values for the ship, bullet, and alien speeds in pixels per second
+        self.ship_speed = 300.0 # position is adjusted by 300 pixels every second, however many frames are drawn
         # decimals give us finer control of the ship's speed when we increase the tempo of the game
-        self.bullet_speed = 1.5 # bullets will travel slightly slower than the ship
-        self.alien_speed = 1.0
+        self.bullet_speed = 300.0 # bullets travel as fast as the ship
+        self.alien_speed = 200.0
 
         # fleet direction of 1 represents right; -1 represents left.
         self.fleet_direction = 1
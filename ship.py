@@ -2,25 +2,28 @@
 important to pay attention to licensing when choosing artwork for games. It is easiest to use a bitmap (.bmp) file because Pygame
 loads bitmaps by default. It is also important to pay attention to the background color of your image.'''
 
-import pygame
-from pygame.sprite import Sprite
+from asset_cache import assets
+from compact_sprite import CompactSprite
 
-class Ship(Sprite): # make sure ships inherits from Sprite
+class Ship(CompactSprite): # make sure ships inherits from Sprite (through CompactSprite)
     '''A class to manage the ship.'''
 
+    __slots__ = ('context', 'image', 'rect', 'x', 'moving_right', 'moving_left', 'home_offset') # fixed attributes instead of a dictionary
+
+    IMAGE = 'images/ship.bmp' # also used for the scoreboard's ship icons
+
     def __init__(self, ai_game): # takes the self reference and a reference to the current instance of the AlienInvasion class
         # this gives Ship access to all the game resources defined in AlienInvasion
         '''Initialize the ship and set its starting position.'''
         super().__init__()
-        self.screen = ai_game.screen # assign the screen to an attribute of Ship so we can access easily in all methods in the class
-        self.settings = ai_game.settings # create a settings attribute for Ship so we can use it in update()
-        self.screen_rect = ai_game.screen.get_rect() # allows us to place the ship in the correct location on the screen
+        self.context = ai_game.sprite_context # the screen, its rect and the settings, shared with every other sprite
+        # the screen rect allows us to place the ship in the correct location on the screen
         '''Pygame lets you treat all game elements like rectangles (rects). In order to figure out if two game elements have collided,
         rectangles make that recognition much easier.'''
 
         # Load the ship image and get its rect.
-        self.image = pygame.image.load('images/ship.bmp') # loads the image and give it the location of our ship image
-        # this function (above) returns a surface representing the ship
+        self.image = assets.load_image(self.IMAGE) # loads the image once and give it the location of our ship image
+        # this function (above) returns a surface representing the ship that is shared with the scoreboard's ship icons
         self.rect = self.image.get_rect()
         # when the image is loaded, we call get_rect() to access the ship surface's rect attribute so we can use it to place the ship
 
@@ -28,7 +31,8 @@ class Ship(Sprite): # make sure ships inherits from Sprite
         rectangle, as well as the center to place the object. You can also use attributes of rect to place an object. Options: center, 
         centerx, centery, top, bottom, left, right, midbottom, midtop, midleft, midright.'''
         # Start each new ship at the bottom center of the screen.
-        self.rect.midbottom = self.screen_rect.midbottom # uses this attribute to center horizontally and align at the bottom
+        self.home_offset = 0 # in a two-player game each ship starts this many pixels to one side of the center
+        self.rect.midbottom = self.context.screen_rect.midbottom # uses this attribute to center horizontally and align at the bottom
 
         '''Because we are adjusting the position of the ship by fractions of a pixel, we need to assign the position to a variable
         that can store a decimal value. You can use a decimal value to set an attribute of rect, but the rect will only keep the 
@@ -44,13 +48,14 @@ class Ship(Sprite): # make sure ships inherits from Sprite
         self.moving_right = False
         self.moving_left = False
 
-    def update(self): # not a helper method because it will be called through an instance of ship
-        '''Update the ship's position based on the movement flags.'''
+    def update(self, dt): # not a helper method because it will be called through an instance of ship
+        '''Update the ship's position based on the movement flags; dt is the length of the step in seconds.'''
         # Update the ship's x value, not the rect.
-        if self.moving_right and self.rect.right < self.screen_rect.right: # checks the position of the ship before changing the value
-            self.x += self.settings.ship_speed
+        context = self.context
+        if self.moving_right and self.rect.right < context.screen_rect.right: # checks the position of the ship before changing the value
+            self.x += context.settings.ship_speed * dt # speed is in pixels per second, so scale it by the step length
         if self.moving_left and self.rect.left > 0: # if value of the left side of the rect is > 0, the ship has not reached the edge
-            self.x -= self.settings.ship_speed
+            self.x -= context.settings.ship_speed * dt
         ''' use two separate if blocks instead of an elif to allow the ship's rect.x value to be increased and then decreased 
         when both arrow keys are held down. This results in the ship standing still.'''
 
@@ -60,9 +65,10 @@ class Ship(Sprite): # make sure ships inherits from Sprite
 
     def blitme(self):
         '''Draw the ship at its current location.'''
-        self.screen.blit(self.image, self.rect) # draws the image to the screen at the position specified by self.rect.
+        self.context.screen.blit(self.image, self.rect) # draws the image to the screen at the position specified by self.rect.
     
     def center_ship(self):
         '''Center the ship on the screen.'''
-        self.rect.midbottom = self.screen_rect.midbottom
+        self.rect.midbottom = self.context.screen_rect.midbottom
+        self.rect.x += self.home_offset
         self.x = float(self.rect.x)
@@ -0,0 +1,77 @@
+from math import floor
+
+class SpatialHash:
+    '''A uniform grid that finds the items near a rect without testing every item.
+
+    Items are stored in the coordinates they had when they were inserted. Because the fleet moves as one rigid
+    formation, moving or dropping it only changes a shared offset instead of re-filing every item.'''
+
+    def __init__(self, cell_width, cell_height, margin=1):
+        '''Initialize an empty grid.'''
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+        self.margin = margin # extra pixels around each query to cover rounding when floats are stored in rects
+        self.cells = {} # maps (column, row) to the items in that cell
+        self.items = {} # maps an item to (insertion order, the cells it was filed in)
+        self.offset_x = 0.0 # how far the whole grid has moved since items were inserted
+        self.offset_y = 0.0
+        self.order = 0
+
+    def _cell_range(self, left, top, right, bottom):
+        '''Return the cells covered by a rect given in grid coordinates.'''
+        first_col = floor(left / self.cell_width)
+        last_col = floor((right - 1) / self.cell_width)
+        first_row = floor(top / self.cell_height)
+        last_row = floor((bottom - 1) / self.cell_height)
+        return [(col, row) for col in range(first_col, last_col + 1) for row in range(first_row, last_row + 1)]
+
+    def insert(self, item, rect):
+        '''File item in every cell its rect overlaps.'''
+        left = rect.left - self.offset_x
+        top = rect.top - self.offset_y
+        keys = self._cell_range(left, top, left + rect.width, top + rect.height)
+        for key in keys:
+            self.cells.setdefault(key, []).append(item)
+        self.items[item] = (self.order, keys)
+        self.order += 1
+
+    def remove(self, item):
+        '''Take item out of the grid.'''
+        entry = self.items.pop(item, None)
+        if entry is None:
+            return
+        for key in entry[1]:
+            cell = self.cells[key]
+            cell.remove(item)
+            if not cell:
+                del self.cells[key]
+
+    def translate(self, dx, dy):
+        '''Move everything in the grid by (dx, dy).'''
+        self.offset_x += dx
+        self.offset_y += dy
+
+    def query(self, rect):
+        '''Return the items filed near rect, in the order they were inserted.'''
+        margin = self.margin
+        left = rect.left - self.offset_x - margin
+        top = rect.top - self.offset_y - margin
+        right = rect.right - self.offset_x + margin
+        bottom = rect.bottom - self.offset_y + margin
+
+        found = set()
+        for key in self._cell_range(left, top, right, bottom):
+            cell = self.cells.get(key)
+            if cell:
+                found.update(cell)
+        if len(found) < 2:
+            return list(found)
+        items = self.items
+        return sorted(found, key=lambda item: items[item][0]) # keep the same order a sprite group would use
+
+    def clear(self):
+        '''Remove every item and reset the offset.'''
+        self.cells.clear()
+        self.items.clear()
+        self.offset_x = self.offset_y = 0.0
+        self.order = 0
@@ -0,0 +1,67 @@
+from itertools import takewhile
+
+from pygame.sprite import Group
+
+class SpritePool:
+    '''A class that keeps dead sprites so they can be reset and reused instead of allocated again.'''
+
+    def __init__(self, factory, enabled=True):
+        '''Initialize an empty pool for sprites made by factory.'''
+        self.factory = factory # the sprite class; reused sprites need a reset() that takes the same arguments
+        self.enabled = enabled # a disabled pool always allocates, which makes it easy to compare the two
+        self.free = [] # dead sprites waiting to be reused
+
+        # Counters so we can see how much allocation the pool saves.
+        self.hits = 0 # sprites handed out from the free list
+        self.allocations = 0 # sprites actually created, one for every request the free list couldn't satisfy
+        self.releases = 0 # sprites handed back to the pool
+
+    def acquire(self, *args):
+        '''Return a sprite reset with args, reusing a dead one when there is one.'''
+        if self.free:
+            self.hits += 1
+            sprite = self.free.pop()
+            sprite.reset(*args)
+            return sprite
+
+        self.allocations += 1
+        return self.factory(*args)
+
+    def release(self, sprite):
+        '''Take back a sprite that is no longer in use.'''
+        self.releases += 1
+        if self.enabled:
+            self.free.append(sprite)
+
+    def report(self):
+        '''Return a dictionary with the pool counters.'''
+        return {
+            'hits': self.hits,
+            'allocations': self.allocations,
+            'releases': self.releases,
+            'free': len(self.free),
+        }
+
+    def format_report(self, name):
+        '''Return report() as one line of text, starting with name.'''
+        return ("{}: {hits} reused, {allocations} allocated, {releases} released, {free} free".format(name, **self.report()))
+
+class PooledGroup(Group):
+    '''A sprite group that hands its sprites back to a pool when they are removed.'''
+
+    def __init__(self, pool=None, *sprites):
+        '''Initialize the group with the pool its sprites go back to.'''
+        self.pool = pool
+        super().__init__(*sprites)
+
+    def remove_internal(self, sprite):
+        '''Remove sprite from the group and return it to the pool.'''
+        super().remove_internal(sprite)
+        if self.pool is not None: # each of our sprites lives in exactly one group, so leaving it means it's dead
+            self.pool.release(sprite)
+
+    def remove_leading(self, predicate):
+        '''Remove sprites from the front of the group for as long as predicate is True, without copying the group.'''
+        expired = list(takewhile(predicate, self.spritedict)) # the group keeps sprites in the order they were added
+        if expired:
+            self.remove(*expired)